@@ -91,6 +91,17 @@ DATABASES = {
 }
 
 
+# Cache
+# File based so compiled rule prompts are shared by every gunicorn worker on the host
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -153,4 +164,96 @@ JAZZMIN_SETTINGS = {
     "site_header": "PenSyncAI",
     "site_brand": "PenSyncAI",
     "site_logo": "PenSyncAI/logo.png",
-}
\ No newline at end of file
+}
+
+# Background scoring queue (see `manage.py score_worker`)
+SCORING_WORKER_CONCURRENCY = int(os.getenv('SCORING_WORKER_CONCURRENCY', 4))
+SCORING_JOB_MAX_ATTEMPTS = int(os.getenv('SCORING_JOB_MAX_ATTEMPTS', 5))
+SCORING_JOB_VISIBILITY_TIMEOUT = int(os.getenv('SCORING_JOB_VISIBILITY_TIMEOUT', 120))
+SCORING_JOB_RETRY_DELAY = int(os.getenv('SCORING_JOB_RETRY_DELAY', 10))
+
+# Stored model results for identical article/rules inputs
+AI_RESULT_CACHE_ENABLED = os.getenv('AI_RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+AI_RESULT_CACHE_MAX_ENTRIES = int(os.getenv('AI_RESULT_CACHE_MAX_ENTRIES', 10000))
+AI_RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv('AI_RESULT_CACHE_MEMORY_ENTRIES', 1000))
+
+# Identical model calls running in another process are waited for, up to SINGLE_FLIGHT_WAIT
+# seconds, instead of repeated. A caller that dies gives up its claim after SINGLE_FLIGHT_LEASE.
+SINGLE_FLIGHT_WAIT = float(os.getenv('SINGLE_FLIGHT_WAIT', 30))
+SINGLE_FLIGHT_LEASE = int(os.getenv('SINGLE_FLIGHT_LEASE', 60))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', 0.25))
+
+# Run the sync call alongside the score call instead of after it
+SCORING_SPECULATIVE_SYNC = os.getenv('SCORING_SPECULATIVE_SYNC', 'true').lower() == 'true'
+SCORING_CALL_THREADS = int(os.getenv('SCORING_CALL_THREADS', 8))
+
+# Compiled writing rules per lead writer, invalidated by WritingRule signals
+RULES_PROMPT_CACHE_TIMEOUT = int(os.getenv('RULES_PROMPT_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Local stylometric sync, the model is only asked when the local level falls inside the band
+STYLE_SYNC_ENABLED = os.getenv('STYLE_SYNC_ENABLED', 'true').lower() == 'true'
+STYLE_SYNC_UNCERTAIN_BAND = tuple(int(v) for v in os.getenv('STYLE_SYNC_UNCERTAIN_BAND', '45,70').split(','))
+
+# Articles sharing at least this share of word shingles with an article seen earlier are flagged
+# as near duplicates and not sent to the model, 0 turns the check off
+DUPLICATE_SIMILARITY = float(os.getenv('DUPLICATE_SIMILARITY', 0.8))
+
+# Article embeddings, used to pick the sync exemplars and to find similar articles
+EMBEDDING_BACKEND = {
+    'BACKEND': os.getenv('EMBEDDING_BACKEND', 'modules.embeddings.local.LocalEmbedder'),
+    'OPTIONS': {
+        'TOPIC_WEIGHT': float(os.getenv('EMBEDDING_TOPIC_WEIGHT', 0.5)),
+    },
+}
+# Sync compares an article with the SYNC_EXEMPLARS nearest of the module's SYNC_EXEMPLAR_POOL best scored articles,
+# the model is only sent the nearest one
+SYNC_EXEMPLARS = int(os.getenv('SYNC_EXEMPLARS', 3))
+SYNC_EXEMPLAR_POOL = int(os.getenv('SYNC_EXEMPLAR_POOL', 20))
+# Modules with more articles than the threshold are searched through an inverted file index,
+# probing VECTOR_INDEX_PROBES of its lists. Loaded indexes pick up embeddings written by
+# other processes every VECTOR_INDEX_REFRESH seconds.
+VECTOR_INDEX_ANN_THRESHOLD = int(os.getenv('VECTOR_INDEX_ANN_THRESHOLD', 5000))
+VECTOR_INDEX_PROBES = int(os.getenv('VECTOR_INDEX_PROBES', 8))
+VECTOR_INDEX_REFRESH = float(os.getenv('VECTOR_INDEX_REFRESH', 30))
+
+# Seconds a re-sync cascade waits after the module's best article changes, further changes join it
+SCORING_CASCADE_DELAY = int(os.getenv('SCORING_CASCADE_DELAY', 30))
+
+# Paragraphs per model call when scoring, and articles per batch when a rule change is applied
+SCORING_PARAGRAPH_BATCH = int(os.getenv('SCORING_PARAGRAPH_BATCH', 20))
+# Long articles are split into chunks of about this many tokens, scored at most this many at a time
+SCORING_CHUNK_TOKENS = int(os.getenv('SCORING_CHUNK_TOKENS', 2000))
+SCORING_CHUNK_PARALLELISM = int(os.getenv('SCORING_CHUNK_PARALLELISM', 8))
+SCORING_RULE_REFRESH_BATCH = int(os.getenv('SCORING_RULE_REFRESH_BATCH', 50))
+
+# Model backend for the scoring and sync calls, modules.llm.local.LocalProvider answers
+# deterministically without a network for benchmarks and tests
+LLM_PROVIDER = {
+    'BACKEND': os.getenv('LLM_BACKEND', 'modules.llm.openai_provider.OpenAIProvider'),
+    'OPTIONS': {
+        'MODEL': os.getenv('LLM_MODEL', 'gpt-4o'),
+        'TIMEOUT': float(os.getenv('LLM_TIMEOUT', 60)),
+        'MAX_CONNECTIONS': int(os.getenv('LLM_MAX_CONNECTIONS', 20)),
+        'LATENCY': float(os.getenv('LLM_LOCAL_LATENCY', 0)),
+    },
+}
+
+# Shared by every process on the host through lock files in LLM_GUARD_DIR: a token bucket
+# of LLM_RATE_LIMIT requests per second (0 for none), retries with backoff and a circuit
+# breaker that fails fast for LLM_BREAKER_COOLDOWN seconds after repeated failures.
+# LLM_CALL_DEADLINE bounds a whole call including retries, keep it under GUNICORN_TIMEOUT.
+LLM_GUARD_DIR = os.getenv('LLM_GUARD_DIR', os.path.join(BASE_DIR, 'cache', 'llm'))
+LLM_RATE_LIMIT = float(os.getenv('LLM_RATE_LIMIT', 5))
+LLM_RATE_BURST = int(os.getenv('LLM_RATE_BURST', 10))
+LLM_RETRY_ATTEMPTS = int(os.getenv('LLM_RETRY_ATTEMPTS', 4))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 8))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', 5))
+LLM_BREAKER_COOLDOWN = int(os.getenv('LLM_BREAKER_COOLDOWN', 30))
+LLM_CALL_DEADLINE = float(os.getenv('LLM_CALL_DEADLINE', 25))
+
+# Batch JSON API: articles per request, articles scored at the same time, and seconds
+# a request waits for scores before the rest are handed to score_worker
+SCORING_API_MAX_BATCH = int(os.getenv('SCORING_API_MAX_BATCH', 500))
+SCORING_API_CONCURRENCY = int(os.getenv('SCORING_API_CONCURRENCY', 20))
+SCORING_API_WAIT = float(os.getenv('SCORING_API_WAIT', 20))
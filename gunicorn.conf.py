@@ -6,8 +6,16 @@ import multiprocessing
 load_dotenv('/root/PenSyncAI/.env')  # Adjust the path to your .env file
 
 bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8001')  # Updated default to 8001 to avoid confusion
-workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+
+# GUNICORN_PRESET=asgi serves PenSyncAI.asgi with uvicorn workers, each event loop holds
+# hundreds of requests waiting on the model, so one worker per core is enough
+if os.getenv('GUNICORN_PRESET', 'wsgi') == 'asgi':
+    wsgi_app = 'PenSyncAI.asgi:application'
+    workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+    worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+else:
+    workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+    worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
 threads = int(os.getenv('GUNICORN_THREADS', 2))
 timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
 loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
@@ -1,25 +1,77 @@
-from django.contrib import admin
-from django.urls import reverse
-
-from rules.models import WritingRule
-from .models import Module, Article
+import io
+
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+
+from .exporter import export_response
+from .forms import ArticleImportForm
+from .importer import guess_format, import_articles, read_rows
+from .services import submit_article
+from .models import Module, Article, ArticleRevision, ArticleRuleScore, ScoringJob, AIResult
+from .search import is_supported, search_articles
+from .vectorindex import similar_articles
 from ckeditor.widgets import CKEditorWidget
 from django.db import models
-from django.utils.html import format_html
-from dotenv import load_dotenv
-from openai import OpenAI
-import json
+from django.db.models import F, Q
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+class DeferringChangeList(ChangeList):
+    """Changelist leaving the model admin's list_defer columns out of the page query.
+
+    list_related_columns maps list_select_related relations to the columns shown from
+    them, their other columns are left out too.
+    """
+
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super().get_queryset(request, *args, **kwargs)
+        return queryset.defer(*self.model_admin.list_defer, *self.related_defer())
+
+    def related_defer(self):
+        for relation, shown in getattr(self.model_admin, 'list_related_columns', {}).items():
+            related = self.model._meta.get_field(relation).related_model
+            for field in related._meta.concrete_fields:
+                if not field.primary_key and field.name not in shown:
+                    yield f"{relation}__{field.name}"
 
-load_dotenv()
+class ArticleChangeList(DeferringChangeList):
+    """Article changelist listing full text search results by rank unless a column is sorted."""
 
-client = OpenAI()
+    def get_ordering(self, request, queryset):
+        if 'search_rank' in queryset.query.annotations and ORDER_VAR not in self.params:
+            return [F('search_rank').asc(nulls_last=True), '-pk']
+        return super().get_ordering(request, queryset)
+
+def article_page(request):
+    try:
+        return max(1, int(request.GET.get('articles_page', 1)))
+    except ValueError:
+        return 1
 
 class ArticleInline(admin.TabularInline):
     model = Article
-    fields = ('title_link', 'writer', 'score', 'sync_level', 'updated_at')
-    readonly_fields = ('title_link', 'writer', 'created_at', 'updated_at', 'score', 'feedback')
+    fields = ('title_link', 'writer', 'score', 'sync_level', 'status', 'updated_at')
+    readonly_fields = ('title_link', 'writer', 'updated_at', 'score', 'sync_level', 'status')
     can_delete = False
     extra = 0
+    per_page = 50
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('writer').only(
+            'title', 'module_id', 'writer__username', 'score', 'sync_level', 'status', 'updated_at',
+        )
+        module_id = request.resolver_match.kwargs.get('object_id')
+        if not module_id:
+            return queryset
+        # Only one page of a module's articles is rendered, ModuleAdmin.article_pages links the rest
+        offset = (article_page(request) - 1) * self.per_page
+        page = list(queryset.filter(module_id=module_id).values_list('pk', flat=True)[offset:offset + self.per_page])
+        return queryset.filter(pk__in=page)
 
     def title_link(self, obj):
         return format_html('<a href="{}">{}</a>', obj.get_admin_url(), obj.title)
@@ -32,41 +84,105 @@ class ArticleInline(admin.TabularInline):
     def has_change_permission(self, request, obj=None):
         return False
 
+class ArticleRevisionInline(admin.TabularInline):
+    model = ArticleRevision
+    fields = ('created_at', 'score', 'paragraph_count', 'rules_version')
+    readonly_fields = ('created_at', 'score', 'paragraph_count', 'rules_version')
+    can_delete = False
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('content', 'feedback')
+
+    def paragraph_count(self, obj):
+        return len(obj.paragraph_hashes)
+
+    paragraph_count.short_description = 'Paragraphs'
+
+    def has_add_permission(self, request, obj):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class ArticleRuleScoreInline(admin.TabularInline):
+    model = ArticleRuleScore
+    fields = ('rule_text', 'score', 'suggestion')
+    readonly_fields = ('rule_text', 'score', 'suggestion')
+    can_delete = False
+    extra = 0
+    verbose_name = 'Rule score'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('rule')
+
+    def rule_text(self, obj):
+        return obj.rule.rule_text
+
+    rule_text.short_description = 'Rule'
+
+    def has_add_permission(self, request, obj):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Module)
 class ModuleAdmin(admin.ModelAdmin):
-    list_display = ('title', 'lead_writer', 'created_at', 'updated_at')
+    list_display = ('title', 'lead_writer', 'best_score', 'created_at', 'updated_at')
+    list_select_related = ('lead_writer',)
+    list_related_columns = {'lead_writer': ('username',)}
+    list_defer = ('description',)
     search_fields = ('title', 'lead_writer__username')
     list_filter = ('created_at', 'lead_writer')
     inlines = [ArticleInline]
-    readonly_fields = ('lead_writer', 'created_at', 'updated_at')
-
-    def change_view(self, request, object_id, form_url='', extra_context=None):
-        extra_context = extra_context or {}
-
-        # Create the URL for adding a new article with the module preselected
-        add_article_url = reverse('admin:modules_article_add')  # Replace 'yourapp' with your app's name
-        add_article_url = f"{add_article_url}?module={object_id}"
-
-        # Use Jazzmin classes for styling the button
-        extra_context['add_article_button'] = format_html(
-            '<div style="padding-bottom: 10px;">'
-            '<a class="btn btn-success btn-block" href="{}">Add New Article</a>'
-            '</div>',
-            add_article_url
+    readonly_fields = ('lead_writer', 'best_article', 'best_score', 'article_pages', 'created_at', 'updated_at')
+    actions = ['export_csv', 'export_jsonl']
+
+    def get_changelist(self, request, **kwargs):
+        return DeferringChangeList
+
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            # The admin instance is shared between requests, the page travels on the object
+            obj.articles_page = article_page(request)
+        return obj
+
+    def article_pages(self, obj):
+        total = obj.articles.count()
+        per_page = ArticleInline.per_page
+        page = getattr(obj, 'articles_page', 1)
+        pages = max(1, -(-total // per_page))
+        links = []
+        if page > 1:
+            links.append(format_html('<a href="?articles_page={}">&lsaquo; Previous</a>', page - 1))
+        if page < pages:
+            links.append(format_html('<a href="?articles_page={}">Next &rsaquo;</a>', page + 1))
+        links.append(format_html(
+            '<a href="{}?module__id__exact={}">View all in the article list</a>',
+            reverse('admin:modules_article_changelist'), obj.pk,
+        ))
+        return format_html(
+            'Page {} of {} ({} articles) &nbsp; {}',
+            page, pages, total, format_html(' &middot; '.join(['{}'] * len(links)), *links),
         )
 
-        # Render the view with the updated context
-        response = super().change_view(request, object_id, form_url, extra_context)
+    article_pages.short_description = 'Articles'
 
-        if hasattr(response, 'rendered_content'):
-            content = response.rendered_content
-            content = content.replace(
-                '<div class="object-tools">',
-                f'<div class="object-tools">{extra_context["add_article_button"]}'
-            )
-            response.content = content.encode('utf-8')
+    @admin.action(description="Export the selected modules' articles as CSV")
+    def export_csv(self, request, queryset):
+        return export_response(Article.objects.filter(module__in=queryset), 'csv')
 
-        return response
+    @admin.action(description="Export the selected modules' articles as JSONL")
+    def export_jsonl(self, request, queryset):
+        return export_response(Article.objects.filter(module__in=queryset), 'jsonl')
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        extra_context = extra_context or {}
+        # Shown by admin/modules/module/change_form.html with the module preselected
+        extra_context['add_article_url'] = f"{reverse('admin:modules_article_add')}?module={object_id}"
+        return super().change_view(request, object_id, form_url, extra_context)
 
     def has_change_permission(self, request, obj=None):
         if request.user.is_superuser:
@@ -102,16 +218,25 @@ class ArticleAdmin(admin.ModelAdmin):
     formfield_overrides = {
         models.TextField: {'widget': CKEditorWidget()},
     }
-    list_display = ('title', 'module', 'writer', 'score', 'sync_level', 'updated_at')
+    list_display = ('title', 'module', 'writer', 'score', 'sync_level', 'status', 'near_copy_of', 'updated_at')
+    list_select_related = ('module', 'writer')
+    list_related_columns = {'module': ('title',), 'writer': ('username',)}
+    # The page only shows the short columns, the text and binary ones stay in the database
+    list_defer = (
+        'content', 'feedback', 'sync_suggestion', 'plain_content', 'plain_content_hash', 'style_vector',
+        'minhash', 'minhash_content_hash', 'embedding', 'embedding_content_hash',
+    )
     search_fields = ('title', 'writer__username', 'module__title')
-    list_filter = ('created_at', 'module', 'writer')
+    list_filter = ('created_at', 'status', 'module', 'writer')
+    inlines = [ArticleRuleScoreInline, ArticleRevisionInline]
+    actions = ['export_csv', 'export_jsonl']
     
     def get_readonly_fields(self, request, obj=None):
         # If the user is a superuser or the creator, allow editing the content
         if request.user.is_superuser or (obj and obj.writer == request.user):
-            return ('score', 'feedback', 'writer', 'sync_level', 'sync_suggestion', 'created_at', 'updated_at')
+            return ('score', 'feedback', 'writer', 'sync_level', 'sync_suggestion', 'status', 'near_copy_of', 'similar', 'prompt_tokens', 'created_at', 'updated_at')
         # For others, make content read-only and use formatted content
-        return ('formatted_content', 'score', 'feedback', 'writer', 'sync_level', 'sync_suggestion', 'created_at', 'updated_at')
+        return ('formatted_content', 'score', 'feedback', 'writer', 'sync_level', 'sync_suggestion', 'status', 'near_copy_of', 'similar', 'prompt_tokens', 'created_at', 'updated_at')
 
     def get_form(self, request, obj=None, **kwargs):
         # If the user is not the creator and not a superuser, replace 'content' with 'formatted_content'
@@ -128,29 +253,76 @@ class ArticleAdmin(admin.ModelAdmin):
             initial['module'] = module_id
         return initial
 
-    def save_model(self, request, obj, form, change):
-        score, suggestion = ai_check_write(obj.content)
-        obj.score = score
-        obj.feedback = suggestion
+    def get_changelist(self, request, **kwargs):
+        return ArticleChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term or not is_supported():
+            return super().get_search_results(request, queryset, search_term)
+        # Title, text and feedback come from the full text index, best matches first, then the
+        # articles of matching writers and modules, looked up in their own small tables first
+        writers = list(User.objects.filter(username__icontains=term).values_list('pk', flat=True))
+        modules = list(Module.objects.filter(title__icontains=term).values_list('pk', flat=True))
+        related = Q(writer_id__in=writers) | Q(module_id__in=modules)
+        found = search_articles(queryset, search_term, also=related)
+        if found is None:
+            # No words to match in the text, only names
+            return queryset.filter(related), False
+        return found, False
+
+    @admin.action(description='Export selected articles as CSV')
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+
+    @admin.action(description='Export selected articles as JSONL')
+    def export_jsonl(self, request, queryset):
+        return export_response(queryset, 'jsonl')
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='modules_article_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ArticleImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            module = form.cleaned_data['module']
+            # Parsed straight from the upload, one row in memory at a time
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_articles(
+                    read_rows(stream, form.cleaned_data['format'] or guess_format(upload.name)),
+                    writer=request.user.pk,
+                    module=module.pk if module else None,
+                    defer_scoring=form.cleaned_data['defer_scoring'],
+                    # Only superusers may import articles in other writers' names
+                    writer_column=request.user.is_superuser,
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f"Import failed: {e}")
+            else:
+                messages.success(request, str(result))
+                for error in result.errors:
+                    messages.warning(request, error)
+                return redirect('admin:modules_article_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import articles',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/modules/article/import_articles.html', context)
 
+    def save_model(self, request, obj, form, change):
         if not change or not obj.writer_id:
             obj.writer = request.user
 
-        best_article = Article.objects.filter(module=obj.module).order_by('-score').first()
-
-        if best_article and obj.score >= best_article.score:
-            obj.sync_level = obj.score
-            obj.sync_suggestion = "Great job! The article is well-written and perfectly aligned. No sync needed."
-        elif best_article:
-            sync_level, sync_suggestion = ai_sync_article(best_article.content, obj.content)
-            obj.sync_level = sync_level
-            obj.sync_suggestion = sync_suggestion
-        else:
-            obj.sync_level = obj.score 
-            obj.sync_suggestion = "No Other Article, Re-Save Later"
-
-        # Save the object
-        super().save_model(request, obj, form, change)
+        # Scoring runs in the score_worker process, the save itself never waits on the model
+        submit_article(obj)
 
     def has_change_permission(self, request, obj=None):
         if request.user.is_superuser:
@@ -181,109 +353,68 @@ class ArticleAdmin(admin.ModelAdmin):
 
     formatted_content.short_description = 'Content'
 
-def ai_check_write(article):
-    active_rules = WritingRule.objects.filter(is_active=True).order_by('created_at')
-    rules_text = " ".join([rule.rule_text for rule in active_rules])
-    system_message = f"Trigger the score_article function no need for reply. You rate the user article based on these rules: {rules_text}"
-    messages = [
-        {"role": "system", "content": system_message},
-        {"role": "user", "content": article},
-        {"role": "system", "content": "trigger score_article function"},
-    ]
-
-    try:
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            tools=[
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "score_article",
-                        "description": "this function always triggers. this gives the article score and suggestion on how to improve the score",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "score": {
-                                    "type": "integer",
-                                    "description": "Score of the writer on how good it follows the rules from 1 to 100. 100 is perfect.",
-                                },
-                                "suggestion": {
-                                    "type": "string",
-                                    "description": "Suggestion to the writer on how to get a higher score. use easy to understand words. just congratulate if the score is perfect",
-                                },
-                            },
-                            "required": ["score"],
-                        },
-                    },
-                },
-            ],
+    def prompt_tokens(self, obj):
+        if not obj.content_tokens:
+            return '-'
+        saved = 100 - round(100 * obj.plain_tokens / obj.content_tokens)
+        return f"{obj.plain_tokens} sent to the model instead of {obj.content_tokens} ({saved}% saved)"
+
+    prompt_tokens.short_description = 'Prompt tokens'
+
+    def near_copy_of(self, obj):
+        # Linked by id so the changelist needs no join for it
+        if not obj.duplicate_of_id:
+            return '-'
+        return format_html(
+            '<a href="{}">#{}</a> ({} the same)',
+            reverse('admin:modules_article_change', args=[obj.duplicate_of_id]),
+            obj.duplicate_of_id, f"{obj.duplicate_similarity or 0:.0%}",
         )
-        tool_calls = completion.choices[0].message.tool_calls
-        
-        if tool_calls:
-            function_name = tool_calls[0].function.name 
-            arguments = tool_calls[0].function.arguments 
-            arguments_dict = json.loads(arguments)
-            
-            if function_name == "score_article":
-                score = arguments_dict['score']
-                suggestion = arguments_dict['suggestion']
-                return score, suggestion
-            else:
-                return None, None
-    except Exception as e:
-        return None, None
-
-def ai_sync_article(best_article, normal_article):
-    messages = [
-        {"role": "system", "content": "Give me the best_article:"},
-        {"role": "user", "content": best_article},
-        {"role": "system", "content": "Now Give me the normal article:"},
-        {"role": "user", "content": normal_article},
-        {"role": "system", "content": "Score how close is the writing style of normal_article to best_article. trigger sync_article function 100 percent of the time"},
-    ]
 
-    try:
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            tools=[
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "sync_article",
-                        "description": "This function triggers 100 percent of the time. Score how close is the writing style of normal_article to best_article and give tips on how to improve the score.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "sync_level": {
-                                    "type": "integer",
-                                    "description": "Score how close is the writing style of normal_article to best_article from 1 to 100. 100 is perfect.",
-                                },
-                                "sync_suggestion": {
-                                    "type": "string",
-                                    "description": "Give suggestion to the writer on how to make the writing style of normal_article more close to the style of best_article. dont mention normal_article and best_article. use easy to understand words. just congratulate if the score is perfect",
-                                },
-                            },
-                            "required": ["sync_level"],
-                        },
-                    },
-                },
-            ],
+    near_copy_of.short_description = 'Near copy of'
+
+    def similar(self, obj):
+        if not obj.pk:
+            return '-'
+        found = similar_articles(obj, k=5)
+        if not found:
+            return '-'
+        return format_html_join(
+            mark_safe('<br>'), '<a href="{}">{}</a> ({} similar, score {})',
+            ((article.get_admin_url(), article.title, f"{similarity:.0%}", article.score if article.score is not None else '-')
+             for article, similarity in found),
         )
-        tool_calls = completion.choices[0].message.tool_calls
-        
-        if tool_calls:
-            function_name = tool_calls[0].function.name 
-            arguments = tool_calls[0].function.arguments 
-            arguments_dict = json.loads(arguments)
-            
-            if function_name == "sync_article":
-                sync_level = arguments_dict['sync_level']
-                sync_suggestion = arguments_dict['sync_suggestion']
-                return sync_level, sync_suggestion
-            else:
-                return None, None
-    except Exception as e:
-        return None, None
+
+    similar.short_description = 'Similar articles'
+
+@admin.register(ScoringJob)
+class ScoringJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'article', 'module', 'status', 'priority', 'attempts', 'available_at', 'locked_by', 'updated_at')
+    list_select_related = ('article', 'module')
+    list_filter = ('kind', 'status')
+    search_fields = ('article__title', 'module__title')
+    readonly_fields = ('kind', 'priority', 'article', 'module', 'status', 'attempts', 'max_attempts', 'available_at', 'locked_until', 'locked_by', 'last_error', 'created_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(AIResult)
+class AIResultAdmin(admin.ModelAdmin):
+    list_display = ('key', 'kind', 'hits', 'created_at', 'last_used_at')
+    list_defer = ('result',)
+
+    def get_changelist(self, request, **kwargs):
+        return DeferringChangeList
+
+    list_filter = ('kind',)
+    search_fields = ('key',)
+    readonly_fields = ('key', 'kind', 'result', 'hits', 'created_at', 'last_used_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,113 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from rules.prompts import get_rules_prompt
+from . import pool
+from .cache import acached_result, cached_result, content_hash, store_result, stored_result
+from .llm import get_provider
+from .llm.guard import aguarded_call, aguarded_stream, guarded_call
+from .text import chunk_paragraphs, count_tokens, prompt_paragraphs
+
+def ai_check_paragraphs(paragraphs, rules=None):
+    """Score each paragraph against each rule.
+
+    Returns one {rule hash: (score, suggestion)} dict per paragraph, or None when the call fails.
+    """
+    rules = rules or get_rules_prompt().rules
+    labels = {f"R{number}": rule for number, rule in enumerate(rules, 1)}
+    results = guarded_call(get_provider(), 'score_paragraphs', paragraphs, labels)
+    if results is None:
+        return None
+    return _paragraph_results(results, len(paragraphs), labels)
+
+async def aai_check_paragraphs(paragraphs, rules):
+    labels = {f"R{number}": rule for number, rule in enumerate(rules, 1)}
+    results = await aguarded_call(get_provider(), 'ascore_paragraphs', paragraphs, labels)
+    if results is None:
+        return None
+    return _paragraph_results(results, len(paragraphs), labels)
+
+def _paragraph_results(results, count, labels):
+    results = [
+        {labels[label].hash: result for label, result in evaluations.items() if label in labels}
+        for evaluations in results
+    ]
+    # Every paragraph needs a score for every rule, a partial answer is a failed call
+    expected = {rule.hash for rule in labels.values()}
+    if len(results) != count or any(set(r) != expected for r in results):
+        return None
+    return results
+
+def ai_sync_article(best_article, normal_article, use_cache=True):
+    budget = settings.SCORING_CHUNK_TOKENS
+    if count_tokens(best_article) + count_tokens(normal_article) <= budget:
+        return _sync_chunk(best_article, normal_article, use_cache)
+
+    # Long articles: every chunk is compared with the same excerpt of the best article
+    # concurrently, then the levels are averaged by length
+    excerpt = "\n\n".join(chunk_paragraphs(prompt_paragraphs(best_article), budget // 2)[0])
+    chunks = ["\n\n".join(chunk) for chunk in chunk_paragraphs(prompt_paragraphs(normal_article), budget // 2)]
+    results = pool.map_chunks(_sync_chunk, [(excerpt, chunk, use_cache) for chunk in chunks])
+    return _reduce_sync(chunks, results)
+
+async def aai_sync_article(best_article, normal_article, use_cache=True):
+    budget = settings.SCORING_CHUNK_TOKENS
+    if count_tokens(best_article) + count_tokens(normal_article) <= budget:
+        return await _async_chunk(best_article, normal_article, use_cache)
+
+    excerpt = "\n\n".join(chunk_paragraphs(prompt_paragraphs(best_article), budget // 2)[0])
+    chunks = ["\n\n".join(chunk) for chunk in chunk_paragraphs(prompt_paragraphs(normal_article), budget // 2)]
+    results = await asyncio.gather(*(_async_chunk(excerpt, chunk, use_cache) for chunk in chunks))
+    return _reduce_sync(chunks, results)
+
+def _sync_chunk(best_article, normal_article, use_cache=True):
+    return cached_result(
+        'sync',
+        [content_hash(best_article), content_hash(normal_article)],
+        lambda: guarded_call(get_provider(), 'sync_article', best_article, normal_article),
+        bypass=not use_cache,
+    )
+
+async def astream_sync_article(best_article, normal_article, use_cache=True):
+    """Yield ('level', int) and ('token', str) events of the sync answer as the model writes it."""
+    key_parts = [content_hash(best_article), content_hash(normal_article)]
+    result = await sync_to_async(stored_result)('sync', key_parts) if use_cache else None
+    if result is None and count_tokens(best_article) + count_tokens(normal_article) > settings.SCORING_CHUNK_TOKENS:
+        # Chunked syncs are reduced at the end, there is nothing to stream before that
+        result = await aai_sync_article(best_article, normal_article, use_cache=use_cache)
+    if result is not None:
+        if result[0] is not None:
+            yield 'level', result[0]
+            yield 'token', result[1]
+        return
+
+    level, tokens = None, []
+    async for kind, value in aguarded_stream(get_provider(), 'astream_sync', best_article, normal_article):
+        if kind == 'level':
+            level = value
+        else:
+            tokens.append(value)
+        yield kind, value
+    await sync_to_async(store_result)('sync', key_parts, (level, "".join(tokens)))
+
+async def _async_chunk(best_article, normal_article, use_cache=True):
+    return await acached_result(
+        'sync',
+        [content_hash(best_article), content_hash(normal_article)],
+        lambda: aguarded_call(get_provider(), 'async_article', best_article, normal_article),
+        bypass=not use_cache,
+    )
+
+def _reduce_sync(chunks, results, limit=2):
+    if len(results) == 1:
+        return results[0]
+    if any(level is None for level, _ in results):
+        return None, None
+    weights = [max(1, len(chunk.split())) for chunk in chunks]
+    level = round(sum(level * weight for (level, _), weight in zip(results, weights)) / sum(weights))
+    # The parts furthest from the best article's style carry the advice
+    weakest = sorted(enumerate(results, 1), key=lambda item: item[1][0])[:limit]
+    suggestion = " ".join(f"Part {part}: {text}" for part, (_, text) in sorted(weakest) if text)
+    return level, suggestion
@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.http import JsonResponse
+
+from . import services
+from .forms import ArticleForm
+from .models import Article
+
+
+def _basic_auth_user(request):
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'basic':
+        return None
+    try:
+        username, _, password = base64.b64decode(credentials).decode('utf-8').partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    user = authenticate(request, username=username, password=password)
+    return user if user and user.is_active else None
+
+
+def _error(message, status):
+    response = JsonResponse({'error': message}, status=status)
+    if status == 401:
+        response['WWW-Authenticate'] = 'Basic realm="PenSyncAI"'
+    return response
+
+
+def article_result(article, job=None):
+    result = {'id': article.pk, 'status': article.status}
+    if article.status == Article.STATUS_DONE:
+        result.update({
+            'score': article.score,
+            'feedback': article.feedback,
+            'sync_level': article.sync_level,
+            'sync_suggestion': article.sync_suggestion,
+        })
+    if job:
+        result['job_id'] = job.pk
+    return result
+
+
+def _validate(items, user):
+    errors, articles = {}, []
+    for index, item in enumerate(items):
+        form = ArticleForm(item if isinstance(item, dict) else {})
+        if not form.is_valid():
+            errors[index] = form.errors.get_json_data()
+            continue
+        article = form.save(commit=False)
+        article.writer = user
+        articles.append((index, article))
+    return errors, articles
+
+
+async def score_batch(request):
+    """Create and score a batch of articles for the authenticated writer.
+
+    POST {"articles": [{"title": ..., "content": ..., "module": id}, ...], "wait": true}
+    with HTTP Basic auth. With wait the articles are scored concurrently and returned with
+    their scores, articles not scored in time come back with the job_id of their queued job.
+    Without wait every article is queued and only job ids are returned.
+    """
+    if request.method != 'POST':
+        return _error("POST a JSON body", 405)
+    user = await sync_to_async(_basic_auth_user)(request)
+    if user is None:
+        return _error("Authentication required", 401)
+    try:
+        payload = json.loads(request.body)
+        items = payload['articles']
+    except (ValueError, KeyError, TypeError):
+        return _error("Expected a JSON object with an articles list", 400)
+    if not isinstance(items, list) or not items:
+        return _error("Expected a JSON object with an articles list", 400)
+    if len(items) > settings.SCORING_API_MAX_BATCH:
+        return _error(f"At most {settings.SCORING_API_MAX_BATCH} articles per request", 400)
+
+    errors, articles = await sync_to_async(_validate)(items, user)
+    # Anything that fails or runs out of time is finished by score_worker
+    jobs = await services.asubmit_articles(
+        [article for _, article in articles], score_now=payload.get('wait', True), timeout=settings.SCORING_API_WAIT,
+    )
+
+    results = [{'index': index, 'errors': error} for index, error in errors.items()]
+    results += [{'index': index, **article_result(article, jobs.get(article.pk))} for index, article in articles]
+    return JsonResponse({'results': sorted(results, key=lambda result: result['index'])})
+
+# Basic auth requests carry no CSRF token, and csrf_exempt only wraps sync views on Django 4.2
+score_batch.csrf_exempt = True
+
+
+async def article_status(request, pk):
+    """GET the scoring status and results of one of the writer's articles, for polling queued ones."""
+    user = await sync_to_async(_basic_auth_user)(request)
+    if user is None:
+        return _error("Authentication required", 401)
+    articles = Article.objects.all() if user.is_superuser else Article.objects.filter(writer=user)
+    article = await articles.filter(pk=pk).afirst()
+    if article is None:
+        return _error("Article not found", 404)
+    return JsonResponse(article_result(article))
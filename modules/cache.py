@@ -0,0 +1,148 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AIResult
+from .singleflight import asingle_flight, single_flight
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'shared': 0}
+
+
+def normalize_content(text):
+    return " ".join((text or "").split())
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize_content(text).encode('utf-8')).hexdigest()
+
+
+def make_key(kind, *parts):
+    digest = hashlib.sha256(kind.encode('utf-8'))
+    for part in parts:
+        digest.update(b'\0')
+        digest.update(str(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_counters)
+    stats['memory_entries'] = len(_memory)
+    stats['stored_entries'] = AIResult.objects.count()
+    return stats
+
+
+def _remember(key, result):
+    with _lock:
+        _memory[key] = result
+        _memory.move_to_end(key)
+        while len(_memory) > settings.AI_RESULT_CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _lookup(key):
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+
+    entry = AIResult.objects.filter(key=key).values_list('result', flat=True).first()
+    if entry is None:
+        return None
+    # Memory hits skip this write, so the stored LRU order is only as fresh as the last cold read
+    AIResult.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    result = tuple(entry)
+    _remember(key, result)
+    return result
+
+
+def _store(key, kind, result):
+    # Plain statements instead of update_or_create: a read-then-write transaction
+    # deadlocks against other writers on SQLite instead of waiting for the lock
+    values = {'kind': kind, 'result': list(result), 'last_used_at': timezone.now()}
+    if not AIResult.objects.filter(key=key).update(**values):
+        try:
+            AIResult.objects.create(key=key, **values)
+        except IntegrityError:
+            # Another worker stored the same result first
+            pass
+    _remember(key, result)
+
+    overflow = AIResult.objects.count() - settings.AI_RESULT_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        stale = AIResult.objects.order_by('last_used_at').values_list('pk', flat=True)[:overflow]
+        AIResult.objects.filter(pk__in=list(stale)).delete()
+
+
+def cached_result(kind, key_parts, compute, bypass=False):
+    """Return compute()'s (value, text) pair, reusing the stored result for identical inputs."""
+    if bypass or not settings.AI_RESULT_CACHE_ENABLED:
+        return compute()
+
+    key = make_key(kind, *key_parts)
+    result = _lookup(key)
+    if result is not None:
+        with _lock:
+            _counters['hits'] += 1
+        return result
+
+    def compute_and_store():
+        result = compute()
+        # Failed calls come back as (None, None) and must not be cached
+        if result and result[0] is not None:
+            _store(key, kind, result)
+        return result
+
+    # Identical calls already running elsewhere are waited for instead of repeated
+    result, shared = single_flight(key, compute_and_store, lambda: _lookup(key))
+    with _lock:
+        _counters['shared' if shared else 'misses'] += 1
+    return result
+
+
+async def acached_result(kind, key_parts, compute, bypass=False):
+    """cached_result for a coroutine function compute."""
+    if bypass or not settings.AI_RESULT_CACHE_ENABLED:
+        return await compute()
+
+    key = make_key(kind, *key_parts)
+    lookup = sync_to_async(_lookup)
+    result = await lookup(key)
+    if result is not None:
+        with _lock:
+            _counters['hits'] += 1
+        return result
+
+    async def compute_and_store():
+        result = await compute()
+        if result and result[0] is not None:
+            await sync_to_async(_store)(key, kind, result)
+        return result
+
+    result, shared = await asingle_flight(key, compute_and_store, lambda: _lookup(key))
+    with _lock:
+        _counters['shared' if shared else 'misses'] += 1
+    return result
+
+
+def stored_result(kind, key_parts):
+    """The stored result for these inputs or None, for callers that compute the result themselves."""
+    if not settings.AI_RESULT_CACHE_ENABLED:
+        return None
+    result = _lookup(make_key(kind, *key_parts))
+    with _lock:
+        _counters['hits' if result is not None else 'misses'] += 1
+    return result
+
+
+def store_result(kind, key_parts, result):
+    if settings.AI_RESULT_CACHE_ENABLED and result and result[0] is not None:
+        _store(make_key(kind, *key_parts), kind, result)
@@ -0,0 +1,168 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .cache import content_hash
+from .models import Article, ArticleBand, ArticleRevision
+from .text import split_paragraphs
+
+SHINGLE_WORDS = 5
+# 20 bands of 6 rows: pairs sharing 80% of their shingles almost always share a bucket,
+# pairs under 30% rarely do, so only real candidates are compared
+BANDS = 20
+ROWS = 6
+PERMUTATIONS = BANDS * ROWS
+
+WORD_RE = re.compile(r'\w+')
+
+# Multiply-shift hashes with fixed seeds, so signatures are comparable across processes
+_seeds = np.random.default_rng(20240601).integers(1, 2 ** 63, size=(2, PERMUTATIONS), dtype=np.uint64)
+MULTIPLIERS = (_seeds[0] | np.uint64(1)).reshape(-1, 1)
+OFFSETS = _seeds[1].reshape(-1, 1)
+
+
+def shingles(content):
+    """Return the crc32 hashes of the overlapping word 5-grams of an article's text."""
+    words = [word.lower() for paragraph in split_paragraphs(content) for word in WORD_RE.findall(paragraph)]
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    count = max(1, len(words) - SHINGLE_WORDS + 1)
+    grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(count)}
+    return np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+def signature(content):
+    """Return the uint32 MinHash signature of an article's content, None when it has no words."""
+    hashes = shingles(content)
+    if not hashes.size:
+        return None
+    # The high 32 bits of a*x + b (mod 2**64) for every permutation and shingle
+    permuted = (MULTIPLIERS * hashes + OFFSETS) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def pack(vector):
+    return vector.astype(np.uint32).tobytes()
+
+
+def unpack(data):
+    if not data:
+        return None
+    vector = np.frombuffer(bytes(data), dtype=np.uint32)
+    return vector if vector.shape[0] == PERMUTATIONS else None
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.mean(first == second))
+
+
+def buckets(vector):
+    # The band number is part of the key, so one indexed column serves every band
+    rows = vector.reshape(BANDS, ROWS)
+    digests = (hashlib.blake2b(bytes([band]) + rows[band].tobytes(), digest_size=8).digest() for band in range(BANDS))
+    return [int.from_bytes(digest, 'big', signed=True) for digest in digests]
+
+
+def _seen_key(seen_at, pk):
+    # Ties go by id, a text with no first seen time counts as new
+    return seen_at or timezone.now(), pk
+
+
+def _original(article, vector):
+    if vector is None:
+        return None, None
+    candidates = (
+        ArticleBand.objects.filter(bucket__in=buckets(vector)).exclude(article_id=article.pk)
+        .values_list('article_id', flat=True)
+        .distinct()
+    )
+    seen = _seen_key(article.minhash_at, article.pk)
+    original = None
+    rows = Article.objects.filter(pk__in=list(candidates)).values_list('pk', 'minhash', 'minhash_at')
+    for pk, data, seen_at in rows:
+        other = unpack(data)
+        if other is None or _seen_key(seen_at, pk) >= seen:
+            continue
+        score = similarity(vector, other)
+        # The first text seen is the original, whichever article it lives in now
+        if score >= settings.DUPLICATE_SIMILARITY and (original is None or _seen_key(seen_at, pk) < original[0]):
+            original = _seen_key(seen_at, pk), pk, score
+    if original is None:
+        return None, None
+    return original[1], original[2]
+
+
+def _first_seen(pending):
+    """Set minhash_at to the oldest revision with the article's current text, or its last save."""
+    if not pending:
+        return
+    revisions = (
+        ArticleRevision.objects.filter(article__in=[article for article, _ in pending],
+                                       content_hash__in={digest for _, digest in pending})
+        .values_list('article_id', 'content_hash')
+        .annotate(first=Min('created_at'))
+    )
+    seen = {(pk, digest): first for pk, digest, first in revisions}
+    for article, digest in pending:
+        article.minhash_at = seen.get((article.pk, digest)) or article.updated_at or timezone.now()
+
+
+def update_signatures(articles, batch_size=500):
+    """Store the MinHash and LSH buckets of articles whose content changed since the last check.
+
+    Returns the articles whose signature was recomputed.
+    """
+    changed = []
+    for article in articles:
+        digest = content_hash(article.content)
+        if article.minhash_content_hash == digest:
+            continue
+        vector = signature(article.content)
+        previous = unpack(article.minhash)
+        # Small edits keep the text's first seen time, so touching up an original never makes it the copy
+        if article.minhash_at is None or previous is None or vector is None or (
+            similarity(previous, vector) < settings.DUPLICATE_SIMILARITY
+        ):
+            article.minhash_at = None
+        article.minhash = pack(vector) if vector is not None else None
+        article.minhash_content_hash = digest
+        changed.append((article, vector, digest))
+    if not changed:
+        return []
+    _first_seen([(article, digest) for article, _, digest in changed if article.minhash_at is None])
+    with transaction.atomic():
+        ArticleBand.objects.filter(article__in=[article for article, _, _ in changed]).delete()
+        ArticleBand.objects.bulk_create(
+            [ArticleBand(article=article, bucket=bucket)
+             for article, vector, _ in changed if vector is not None
+             for bucket in buckets(vector)],
+            batch_size=batch_size,
+        )
+        Article.objects.bulk_update([article for article, _, _ in changed],
+                                    ['minhash', 'minhash_content_hash', 'minhash_at'], batch_size=batch_size)
+    return [article for article, _, _ in changed]
+
+
+def find_duplicates(articles):
+    """Point each article at the article it nearly copies, whose text was seen first, or clear the pointer."""
+    articles = list(articles)
+    for article in articles:
+        article.duplicate_of_id, article.duplicate_similarity = _original(article, unpack(article.minhash))
+    Article.objects.bulk_update(articles, ['duplicate_of', 'duplicate_similarity'])
+    return [article for article in articles if article.duplicate_of_id]
+
+
+def check_duplicate(article):
+    """Return whether a saved article nearly copies a text seen earlier, only redoing the work after a content change."""
+    if not settings.DUPLICATE_SIMILARITY or not article.pk:
+        return False
+    if update_signatures([article]):
+        find_duplicates([article])
+    return article.duplicate_of_id is not None
@@ -0,0 +1,31 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_embedder = None
+_lock = threading.Lock()
+
+
+def get_embedder():
+    """Return the process wide embedding backend configured in settings.EMBEDDING_BACKEND."""
+    global _embedder
+    if _embedder is None:
+        with _lock:
+            if _embedder is None:
+                config = settings.EMBEDDING_BACKEND
+                _embedder = import_string(config['BACKEND'])(config.get('OPTIONS', {}))
+    return _embedder
+
+
+def pack(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def unpack(data):
+    if not data:
+        return None
+    vector = np.frombuffer(bytes(data), dtype=np.float32)
+    # Embeddings made by another backend or version are treated as missing
+    return vector if vector.shape[0] == get_embedder().dimensions else None
@@ -0,0 +1,14 @@
+class BaseEmbedder:
+    """Turns an article's HTML content into a unit length float32 vector of `dimensions` values.
+
+    The same content must always give the same vector, the vectors are stored and compared
+    with the dot product.
+    """
+
+    dimensions = None
+
+    def __init__(self, options=None):
+        self.options = options or {}
+
+    def embed(self, content):
+        raise NotImplementedError
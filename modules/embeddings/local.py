@@ -0,0 +1,50 @@
+import zlib
+
+import numpy as np
+
+from .. import stylometry
+from ..text import split_paragraphs
+from .base import BaseEmbedder
+
+TOPIC_DIMENSIONS = 256
+STOP_WORDS = frozenset(stylometry.FUNCTION_WORDS)
+
+
+class LocalEmbedder(BaseEmbedder):
+    """Deterministic embedding without a model: hashed words for the topic, stylometry for the format.
+
+    The TOPIC_WEIGHT option (0 to 1) sets how much the topic counts against the style.
+    """
+
+    dimensions = TOPIC_DIMENSIONS + stylometry.FEATURE_COUNT
+
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.topic_weight = float(self.options.get('TOPIC_WEIGHT', 0.5))
+
+    def topic_vector(self, content):
+        words = [w.lower() for paragraph in split_paragraphs(content) for w in stylometry.WORD_RE.findall(paragraph)]
+        words = [w for w in words if w not in STOP_WORDS]
+        terms = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        vector = np.zeros(TOPIC_DIMENSIONS, dtype=np.float32)
+        for term, count in counts.items():
+            # The hashing trick, with a sign bit so colliding terms tend to cancel out
+            digest = zlib.crc32(term.encode())
+            vector[digest % TOPIC_DIMENSIONS] += (1 + np.log(count)) * (1 if digest & 0x80000000 else -1)
+        return vector
+
+    def style_vector(self, content):
+        return np.clip(stylometry.extract_features(content) / stylometry.FEATURE_SCALES, 0, 10)
+
+    def embed(self, content):
+        parts = []
+        for vector, weight in ((self.topic_vector(content), self.topic_weight),
+                               (self.style_vector(content), 1 - self.topic_weight)):
+            norm = np.linalg.norm(vector)
+            parts.append(vector * np.sqrt(weight) / norm if norm else vector)
+        vector = np.concatenate(parts).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from .cache import content_hash
+from .jobs import enqueue_cascade
+from .models import Article, Module
+from .vectorindex import fetch, get_index, index_article
+
+
+def _exemplar_changed(module_id):
+    # Articles synced against an older revision get re-synced by the cascade job
+    enqueue_cascade(module_id)
+
+
+def recompute_best_article(module_id):
+    with transaction.atomic():
+        # Lock the module row so concurrent recomputes apply one after the other
+        module = (
+            Module.objects.select_for_update().filter(pk=module_id).values('best_article_id', 'best_content_hash').first()
+        )
+        if module is None:
+            return None
+        best = (
+            Article.objects.filter(module_id=module_id, score__isnull=False)
+            .order_by('-score', 'pk')
+            .values('pk', 'score', 'content')
+            .first()
+        )
+        best_pk = best['pk'] if best else None
+        digest = content_hash(best['content']) if best else ''
+        changes = {'best_article_id': best_pk, 'best_score': best['score'] if best else None, 'best_content_hash': digest}
+        if best_pk != module['best_article_id'] or digest != module['best_content_hash']:
+            changes['best_revision'] = F('best_revision') + 1
+        Module.objects.filter(pk=module_id).update(**changes)
+    if 'best_revision' in changes:
+        _exemplar_changed(module_id)
+    return best_pk
+
+
+def note_article_score(article):
+    """Keep the module's best article pointer right after article's score was written."""
+    if article.score is None:
+        if Module.objects.filter(pk=article.module_id, best_article_id=article.pk).exists():
+            recompute_best_article(article.module_id)
+        return
+
+    # The exemplar only changes, and the module only re-syncs, when another article
+    # takes the top spot or the best article's text changed, not on a plain rescore
+    digest = content_hash(article.content)
+    new_exemplar = ~Q(best_article_id=article.pk) | ~Q(best_content_hash=digest)
+
+    # Compare-and-swap: only take the top spot from a strictly lower score,
+    # so two concurrent saves can't both end up as the best article
+    lower = Module.objects.filter(Q(best_score__isnull=True) | Q(best_score__lt=article.score), pk=article.module_id)
+    if lower.filter(new_exemplar).update(
+        best_article_id=article.pk, best_score=article.score, best_content_hash=digest,
+        best_revision=F('best_revision') + 1,
+    ):
+        _exemplar_changed(article.module_id)
+        return
+    if lower.update(best_score=article.score):
+        return
+
+    # The current best was rescored lower, someone else may be ahead now
+    if Module.objects.filter(pk=article.module_id, best_article_id=article.pk).exclude(best_score=article.score).exists():
+        recompute_best_article(article.module_id)
+        return
+
+    # The best article itself was rescored, its content may have changed
+    if Module.objects.filter(new_exemplar, pk=article.module_id, best_article_id=article.pk).update(
+        best_content_hash=digest, best_revision=F('best_revision') + 1,
+    ):
+        _exemplar_changed(article.module_id)
+
+
+def get_exemplar(module_id, exclude_pk=None):
+    """Return the module's best article other than exclude_pk, and the exemplar revision."""
+    module = Module.objects.select_related('best_article').filter(pk=module_id).first()
+    if module is None:
+        return None, 0
+    best = module.best_article
+    revision = module.best_revision
+    # Heal pointers left behind by an article moving to another module or being deleted
+    if (best is None and module.best_score is not None) or (best and best.module_id != module_id):
+        recompute_best_article(module_id)
+        module = Module.objects.select_related('best_article').get(pk=module_id)
+        best = module.best_article
+        revision = module.best_revision
+
+    if best and best.pk == exclude_pk:
+        best = (
+            Article.objects.filter(module_id=module_id, score__isnull=False)
+            .exclude(pk=exclude_pk)
+            .order_by('-score', 'pk')
+            .first()
+        )
+    return best, revision
+
+
+def nearest_exemplars(article, k=None, above=None):
+    """Return the k best scored articles of the module closest to article in topic and style.
+
+    Only the module's SYNC_EXEMPLAR_POOL best scored articles are candidates, and with above
+    only those scored higher. Returns (Article, similarity) pairs, nearest first.
+    """
+    k = k or settings.SYNC_EXEMPLARS
+    candidates = Article.objects.filter(module_id=article.module_id, score__isnull=False).exclude(pk=article.pk)
+    if above is not None:
+        candidates = candidates.filter(score__gt=above)
+    pool = list(
+        candidates
+        .order_by('-score', 'pk')
+        .values_list('pk', flat=True)[:settings.SYNC_EXEMPLAR_POOL]
+    )
+    if not pool:
+        return []
+    vector = index_article(article)
+    hits = []
+    if vector is not None:
+        index = get_index(article.module_id)
+        hits = fetch(index, index.search(vector, k, among=pool))
+    if len(hits) < k:
+        # Candidates not embedded yet fill the rest in score order
+        found = {exemplar.pk for exemplar, _ in hits}
+        extra = [pk for pk in pool if pk not in found][:k - len(hits)]
+        articles = Article.objects.in_bulk(extra)
+        hits += [(articles[pk], 0.0) for pk in extra if pk in articles]
+    return hits
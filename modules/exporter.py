@@ -0,0 +1,51 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATS = ('csv', 'jsonl')
+EXPORT_FIELDS = [
+    'id', 'title', 'module_id', 'module__title', 'module__best_score', 'writer__username',
+    'status', 'score', 'feedback', 'sync_level', 'sync_suggestion', 'rules_version',
+    'created_at', 'updated_at',
+]
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+class _Echo:
+    """A file-like object handing back what csv.writer writes instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def export_fields(include_content=False):
+    if not include_content:
+        return EXPORT_FIELDS
+    return EXPORT_FIELDS + ['plain_content' if include_content == 'plain' else 'content']
+
+
+def export_lines(queryset, format, include_content=False, chunk_size=2000):
+    """Yield the articles of queryset as CSV or JSONL lines, chunk_size rows in memory at a time.
+
+    Only the exported columns are selected, content only when include_content is True
+    (the HTML) or 'plain' (the text sent to the model).
+    """
+    fields = export_fields(include_content)
+    rows = queryset.order_by('pk').values(*fields).iterator(chunk_size=chunk_size)
+    if format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row[field] for field in fields])
+    else:
+        for row in rows:
+            yield json.dumps(row, default=str) + '\n'
+
+
+def export_response(queryset, format, include_content=False):
+    filename = f"articles-{timezone.now():%Y%m%d-%H%M%S}.{format}"
+    response = StreamingHttpResponse(export_lines(queryset, format, include_content), content_type=CONTENT_TYPES[format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,7 +1,14 @@
 from django import forms
-from .models import Article
+from .importer import FORMATS
+from .models import Article, Module
 
 class ArticleForm(forms.ModelForm):
     class Meta:
         model = Article
         fields = ['title', 'content', 'module']
+
+class ArticleImportForm(forms.Form):
+    file = forms.FileField(help_text="JSONL or CSV with title, content, module and writer columns")
+    format = forms.ChoiceField(choices=[('', 'From the file extension')] + [(f, f.upper()) for f in FORMATS], required=False)
+    module = forms.ModelChoiceField(Module.objects.all(), required=False, help_text="Used for rows without a module")
+    defer_scoring = forms.BooleanField(required=False, help_text="Don't queue scoring jobs, score later with rescore_articles --stale")
@@ -0,0 +1,124 @@
+import csv
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .jobs import enqueue_bulk_scoring
+from .models import Article, Module
+from .search import index_articles
+
+FORMATS = ('jsonl', 'csv')
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.queued = 0
+        self.skipped = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Line {line}: {message}")
+
+    def __str__(self):
+        return f"{self.created} articles imported, {self.queued} queued for scoring, {self.skipped} skipped"
+
+
+def guess_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(stream, format):
+    """Yield (line number, row dict) from a text stream, one row in memory at a time."""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = e
+        yield line_number, row
+
+
+class _Lookup:
+    """Resolves ids, usernames or titles to primary keys from maps loaded once per import."""
+
+    def __init__(self, pairs):
+        self.by_pk = {}
+        self.by_name = {}
+        for pk, name in pairs:
+            self.by_pk[str(pk)] = pk
+            # Titles aren't unique, the first one wins like an admin search would show it
+            self.by_name.setdefault(name, pk)
+
+    def resolve(self, value):
+        value = str(value).strip()
+        return self.by_pk.get(value) or self.by_name.get(value)
+
+
+def import_articles(rows, writer=None, module=None, batch_size=500, defer_scoring=False, writer_column=True):
+    """Create articles from (line, row) pairs with title, content, module and writer columns.
+
+    module and writer may be ids, a module title or a username, and fall back to the given
+    defaults, without writer_column every article belongs to writer. Articles are created pending and queued as bulk scoring jobs, or left for
+    `rescore_articles --stale` with defer_scoring.
+    """
+    modules = _Lookup(Module.objects.values_list('pk', 'title').iterator())
+    writers = _Lookup(User.objects.values_list('pk', 'username').iterator())
+    default_module = modules.resolve(module) if module else None
+    default_writer = writers.resolve(writer) if writer else None
+    if module and not default_module:
+        raise ValueError(f"Unknown module {module!r}")
+    if writer and not default_writer:
+        raise ValueError(f"Unknown writer {writer!r}")
+
+    result = ImportResult()
+    batch = []
+    for line, row in rows:
+        if not isinstance(row, dict):
+            result.error(line, f"not a JSON object ({row})" if isinstance(row, Exception) else "not a JSON object")
+            continue
+        title = row.get('title') or ''
+        content = row.get('content') or ''
+        if not isinstance(title, str) or not isinstance(content, str):
+            result.error(line, "title and content must be strings")
+            continue
+        title = title.strip()
+        module_id = modules.resolve(row['module']) if row.get('module') else default_module
+        writer_id = writers.resolve(row['writer']) if writer_column and row.get('writer') else default_writer
+        if not title or not content.strip():
+            result.error(line, "title and content are required")
+        elif not module_id:
+            result.error(line, f"unknown module {row.get('module')!r}")
+        elif not writer_id:
+            result.error(line, f"unknown writer {row.get('writer')!r}")
+        else:
+            batch.append(Article(
+                title=title[:255], content=content, module_id=module_id, writer_id=writer_id,
+                status=Article.STATUS_PENDING,
+            ))
+        if len(batch) >= batch_size:
+            _flush(batch, result, defer_scoring)
+            batch = []
+    if batch:
+        _flush(batch, result, defer_scoring)
+    return result
+
+
+def _flush(batch, result, defer_scoring):
+    with transaction.atomic():
+        created = Article.objects.bulk_create(batch)
+        # bulk_create sends no post_save, the search rows are added here
+        index_articles(created)
+        if not defer_scoring:
+            result.queued += enqueue_bulk_scoring(article.pk for article in created)
+    result.created += len(created)
@@ -0,0 +1,205 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Article, Module, ScoringJob
+
+
+def enqueue_scoring(article, delay=0):
+    # A queued job will read the latest content when it runs, so one is enough
+    job = ScoringJob.objects.filter(
+        article=article, kind=ScoringJob.KIND_SCORE, status=ScoringJob.STATUS_QUEUED
+    ).first()
+    if job:
+        return job
+    return ScoringJob.objects.create(
+        kind=ScoringJob.KIND_SCORE,
+        priority=ScoringJob.PRIORITIES[ScoringJob.KIND_SCORE],
+        article=article,
+        available_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=settings.SCORING_JOB_MAX_ATTEMPTS,
+    )
+
+
+def settle_job(job):
+    """Mark a queued job done because its work was already done elsewhere, like the streamed feedback."""
+    ScoringJob.objects.filter(pk=job.pk, status=ScoringJob.STATUS_QUEUED).update(
+        status=ScoringJob.STATUS_DONE,
+        last_error='',
+        updated_at=timezone.now(),
+    )
+
+
+def expedite_job(job):
+    ScoringJob.objects.filter(pk=job.pk, status=ScoringJob.STATUS_QUEUED).update(
+        available_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def enqueue_bulk_scoring(article_ids):
+    """Queue new articles, like an imported back catalog, behind every other kind of job."""
+    jobs = [
+        ScoringJob(
+            kind=ScoringJob.KIND_SCORE,
+            priority=ScoringJob.PRIORITY_BULK,
+            article_id=pk,
+            max_attempts=settings.SCORING_JOB_MAX_ATTEMPTS,
+        )
+        for pk in article_ids
+    ]
+    ScoringJob.objects.bulk_create(jobs, batch_size=500)
+    return len(jobs)
+
+
+def enqueue_cascade(module_id):
+    # The delay lets a burst of exemplar changes collapse into the one queued cascade
+    job = ScoringJob.objects.filter(
+        module_id=module_id, kind=ScoringJob.KIND_CASCADE, status=ScoringJob.STATUS_QUEUED
+    ).first()
+    if job:
+        return job
+    return ScoringJob.objects.create(
+        kind=ScoringJob.KIND_CASCADE,
+        priority=ScoringJob.PRIORITIES[ScoringJob.KIND_CASCADE],
+        module_id=module_id,
+        available_at=timezone.now() + timedelta(seconds=settings.SCORING_CASCADE_DELAY),
+        max_attempts=settings.SCORING_JOB_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_rule_refresh():
+    job = ScoringJob.objects.filter(kind=ScoringJob.KIND_RULES, status=ScoringJob.STATUS_QUEUED).first()
+    if job:
+        return job
+    return ScoringJob.objects.create(
+        kind=ScoringJob.KIND_RULES,
+        priority=ScoringJob.PRIORITIES[ScoringJob.KIND_RULES],
+        available_at=timezone.now() + timedelta(seconds=settings.SCORING_CASCADE_DELAY),
+        max_attempts=settings.SCORING_JOB_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_resyncs(module_id):
+    """Queue a re-sync for every article of the module synced against an older exemplar."""
+    revision = Module.objects.filter(pk=module_id).values_list('best_revision', flat=True).first()
+    if revision is None:
+        return 0
+
+    # Articles waiting for a score or a re-sync already will pick up the new exemplar
+    queued = ScoringJob.objects.filter(
+        article__module_id=module_id,
+        kind__in=[ScoringJob.KIND_SCORE, ScoringJob.KIND_SYNC],
+        status=ScoringJob.STATUS_QUEUED,
+    ).values('article_id')
+    stale = (
+        Article.objects.filter(module_id=module_id, score__isnull=False)
+        .exclude(synced_revision=revision)
+        .exclude(pk__in=queued)
+        .order_by('-updated_at')
+        .values_list('pk', flat=True)
+    )
+
+    # Same available_at for the whole batch, so the claim order falls back to
+    # insertion order: most recently edited articles first
+    now = timezone.now()
+    jobs = [
+        ScoringJob(
+            kind=ScoringJob.KIND_SYNC,
+            priority=ScoringJob.PRIORITIES[ScoringJob.KIND_SYNC],
+            article_id=pk,
+            available_at=now,
+            max_attempts=settings.SCORING_JOB_MAX_ATTEMPTS,
+        )
+        for pk in stale
+    ]
+    ScoringJob.objects.bulk_create(jobs, batch_size=500)
+    return len(jobs)
+
+
+def _claimable(now):
+    return (
+        Q(status=ScoringJob.STATUS_QUEUED, available_at__lte=now)
+        | Q(status=ScoringJob.STATUS_RUNNING, locked_until__lt=now)
+    )
+
+
+def claim_job(worker_id, visibility_timeout=None):
+    if visibility_timeout is None:
+        visibility_timeout = settings.SCORING_JOB_VISIBILITY_TIMEOUT
+    now = timezone.now()
+    candidates = list(
+        ScoringJob.objects.filter(_claimable(now)).order_by('-priority', 'available_at', 'pk').values_list('pk', flat=True)[:10]
+    )
+    for pk in candidates:
+        # Compare-and-swap: only one worker can move the row out of the claimable state
+        claimed = ScoringJob.objects.filter(_claimable(now), pk=pk).update(
+            status=ScoringJob.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        if claimed:
+            return ScoringJob.objects.select_related('article__module', 'module').get(pk=pk)
+    return None
+
+
+def extend_job(job, visibility_timeout=None):
+    """Push back the lock of a long running job, returns False once another worker took it over."""
+    if visibility_timeout is None:
+        visibility_timeout = settings.SCORING_JOB_VISIBILITY_TIMEOUT
+    now = timezone.now()
+    return bool(ScoringJob.objects.filter(
+        pk=job.pk, status=ScoringJob.STATUS_RUNNING, locked_by=job.locked_by,
+    ).update(locked_until=now + timedelta(seconds=visibility_timeout), updated_at=now))
+
+
+def complete_job(job):
+    ScoringJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=ScoringJob.STATUS_DONE,
+        locked_until=None,
+        last_error='',
+        updated_at=timezone.now(),
+    )
+
+
+def fail_job(job, error):
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        updated = ScoringJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=ScoringJob.STATUS_FAILED,
+            locked_until=None,
+            last_error=str(error),
+            updated_at=now,
+        )
+        if updated and job.kind == ScoringJob.KIND_SCORE:
+            Article.objects.filter(pk=job.article_id).update(status=Article.STATUS_FAILED)
+        return
+
+    # Exponential backoff with a little jitter so failed jobs don't retry in lockstep
+    delay = settings.SCORING_JOB_RETRY_DELAY * (2 ** (job.attempts - 1))
+    delay += random.uniform(0, settings.SCORING_JOB_RETRY_DELAY)
+    ScoringJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=ScoringJob.STATUS_QUEUED,
+        locked_until=None,
+        available_at=now + timedelta(seconds=delay),
+        last_error=str(error),
+        updated_at=now,
+    )
+
+
+def postpone_job(job, error, delay):
+    # The provider being down is not the job's fault, give the attempt back
+    now = timezone.now()
+    ScoringJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=ScoringJob.STATUS_QUEUED,
+        locked_until=None,
+        attempts=F('attempts') - 1,
+        available_at=now + timedelta(seconds=delay + random.uniform(0, settings.SCORING_JOB_RETRY_DELAY)),
+        last_error=str(error),
+        updated_at=now,
+    )
@@ -0,0 +1,18 @@
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_provider = None
+_lock = threading.Lock()
+
+
+def get_provider():
+    """Return the process wide model provider configured in settings.LLM_PROVIDER."""
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                config = settings.LLM_PROVIDER
+                _provider = import_string(config['BACKEND'])(config.get('OPTIONS', {}))
+    return _provider
@@ -0,0 +1,43 @@
+from asgiref.sync import sync_to_async
+
+
+class BaseProvider:
+    """A model backend for the scoring and sync calls.
+
+    Both calls return None (or (None, None) for sync) when the answer is unusable and
+    raise when the request itself fails, see is_retryable. They are called through
+    modules.llm.guard, which passes the seconds left before the deadline as timeout.
+    """
+
+    def __init__(self, options=None):
+        self.options = options or {}
+
+    def score_paragraphs(self, paragraphs, labels, timeout=None):
+        """Score paragraphs against rules, labels maps a prompt label like R1 to its Rule.
+
+        Returns one {label: (score, suggestion)} dict per paragraph, or None.
+        """
+        raise NotImplementedError
+
+    def sync_article(self, best_article, normal_article, timeout=None):
+        """Return (sync_level, sync_suggestion) for how close normal_article's style is to best_article's."""
+        raise NotImplementedError
+
+    # Async variants, the default runs the blocking call in a worker thread
+
+    async def ascore_paragraphs(self, paragraphs, labels, timeout=None):
+        return await sync_to_async(self.score_paragraphs, thread_sensitive=False)(paragraphs, labels, timeout=timeout)
+
+    async def async_article(self, best_article, normal_article, timeout=None):
+        return await sync_to_async(self.sync_article, thread_sensitive=False)(best_article, normal_article, timeout=timeout)
+
+    async def astream_sync(self, best_article, normal_article, timeout=None):
+        """Yield ('level', int) and then ('token', str) events as the sync answer is produced."""
+        level, suggestion = await self.async_article(best_article, normal_article, timeout=timeout)
+        if level is not None:
+            yield 'level', level
+            yield 'token', suggestion
+
+    def is_retryable(self, error):
+        """Whether a failed request is worth retrying, like a timeout or a rate limit."""
+        return isinstance(error, (TimeoutError, ConnectionError))
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files import locks
+
+from ..exceptions import ScoringError
+
+
+class ProviderUnavailable(ScoringError):
+    """The call was not attempted or gave up, retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after=0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def _shared_state(name):
+    """Read and rewrite a small JSON state file while holding an exclusive lock on it.
+
+    Every gunicorn and score_worker process on the host sees the same state.
+    """
+    os.makedirs(settings.LLM_GUARD_DIR, exist_ok=True)
+    path = os.path.join(settings.LLM_GUARD_DIR, f'{name}.json')
+    with open(path, 'a+') as f:
+        locks.lock(f, locks.LOCK_EX)
+        try:
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or '{}')
+            except ValueError:
+                state = {}
+            yield state
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+            f.flush()
+        finally:
+            locks.unlock(f)
+
+
+def _take_token():
+    """Take one request from the host wide token bucket, return 0 or the seconds until one is free."""
+    rate = settings.LLM_RATE_LIMIT
+    if not rate:
+        return 0
+    capacity = max(1, settings.LLM_RATE_BURST)
+    with _shared_state('ratelimit') as bucket:
+        # time.time rather than monotonic so every process agrees on the clock
+        now = time.time()
+        tokens = min(capacity, bucket.get('tokens', capacity) + (now - bucket.get('updated', now)) * rate)
+        bucket['updated'] = now
+        if tokens >= 1:
+            bucket['tokens'] = tokens - 1
+            return 0
+        bucket['tokens'] = tokens
+    return (1 - tokens) / rate
+
+
+def _check_wait(wait, deadline):
+    if time.monotonic() + wait > deadline:
+        raise ProviderUnavailable("Model rate limit reached", retry_after=wait)
+
+
+def acquire_token(deadline):
+    """Wait for a request from the shared token bucket, until the deadline at most."""
+    wait = _take_token()
+    while wait:
+        _check_wait(wait, deadline)
+        time.sleep(wait)
+        wait = _take_token()
+
+
+def _off_loop(function):
+    # The state files are locked against every other process on the host, waiting
+    # on the lock or the disk happens in a thread rather than on the event loop
+    return sync_to_async(function, thread_sensitive=False)
+
+
+async def aacquire_token(deadline):
+    wait = await _off_loop(_take_token)()
+    while wait:
+        _check_wait(wait, deadline)
+        await asyncio.sleep(wait)
+        wait = await _off_loop(_take_token)()
+
+
+def check_circuit():
+    """Fail fast while the circuit is open, letting a single probe through once it cools down."""
+    with _shared_state('circuit') as circuit:
+        now = time.time()
+        opened_until = circuit.get('opened_until', 0)
+        if now < opened_until:
+            raise ProviderUnavailable("The model provider is unavailable", retry_after=opened_until - now)
+        if circuit.get('failures', 0) >= settings.LLM_BREAKER_THRESHOLD:
+            # Half open: other callers keep failing fast until the probe reports back
+            circuit['opened_until'] = now + settings.LLM_BREAKER_COOLDOWN
+
+
+def record_success():
+    with _shared_state('circuit') as circuit:
+        circuit['failures'] = 0
+        circuit['opened_until'] = 0
+
+
+def record_failure():
+    with _shared_state('circuit') as circuit:
+        circuit['failures'] = circuit.get('failures', 0) + 1
+        if circuit['failures'] >= settings.LLM_BREAKER_THRESHOLD:
+            circuit['opened_until'] = time.time() + settings.LLM_BREAKER_COOLDOWN
+
+
+def _start(deadline):
+    if deadline is None:
+        deadline = time.monotonic() + settings.LLM_CALL_DEADLINE
+    check_circuit()
+    return deadline
+
+
+def _remaining(deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise ProviderUnavailable("The model call ran out of time")
+    return remaining
+
+
+def _retry_delay(provider, error, attempt, deadline):
+    """Seconds to back off before the next attempt, raising when the error is final."""
+    if not provider.is_retryable(error):
+        raise error
+    record_failure()
+    delay = random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+    if attempt >= settings.LLM_RETRY_ATTEMPTS or time.monotonic() + delay >= deadline:
+        raise ProviderUnavailable(f"The model call failed: {error}", retry_after=settings.LLM_BREAKER_COOLDOWN) from error
+    return delay
+
+
+def guarded_call(provider, method, *args, deadline=None):
+    """Call a provider method under the shared rate limit, retries and circuit breaker.
+
+    Retryable errors are retried with exponential backoff and full jitter as long as
+    the next attempt fits before the deadline, which defaults to LLM_CALL_DEADLINE
+    seconds from now so web requests finish inside the gunicorn timeout.
+    """
+    attempt = 0
+    while True:
+        deadline = _start(deadline)
+        acquire_token(deadline)
+        try:
+            result = getattr(provider, method)(*args, timeout=_remaining(deadline))
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            attempt += 1
+            time.sleep(_retry_delay(provider, e, attempt, deadline))
+            continue
+        record_success()
+        return result
+
+
+async def aguarded_call(provider, method, *args, deadline=None):
+    """guarded_call for the provider's async methods, waiting without blocking the event loop."""
+    attempt = 0
+    while True:
+        deadline = await _off_loop(_start)(deadline)
+        await aacquire_token(deadline)
+        try:
+            result = await getattr(provider, method)(*args, timeout=_remaining(deadline))
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            attempt += 1
+            await asyncio.sleep(await _off_loop(_retry_delay)(provider, e, attempt, deadline))
+            continue
+        await _off_loop(record_success)()
+        return result
+
+
+async def aguarded_stream(provider, method, *args, deadline=None):
+    """aguarded_call for a provider method that yields events.
+
+    Only failures before the first event are retried, later ones would repeat what was sent.
+    """
+    attempt = 0
+    while True:
+        deadline = await _off_loop(_start)(deadline)
+        await aacquire_token(deadline)
+        started = False
+        try:
+            async for event in getattr(provider, method)(*args, timeout=_remaining(deadline)):
+                started = True
+                yield event
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            if started:
+                if provider.is_retryable(e):
+                    await _off_loop(record_failure)()
+                raise
+            attempt += 1
+            await asyncio.sleep(await _off_loop(_retry_delay)(provider, e, attempt, deadline))
+            continue
+        await _off_loop(record_success)()
+        return
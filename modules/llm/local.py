@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import time
+
+from .. import stylometry
+from .base import BaseProvider
+
+
+def _stable_number(*parts, low=1, high=100):
+    digest = hashlib.sha256("\0".join(parts).encode('utf-8')).digest()
+    return low + int.from_bytes(digest[:4], 'big') % (high - low + 1)
+
+
+class LocalProvider(BaseProvider):
+    """Deterministic offline stand-in for benchmarks and tests, the same input always gets the same answer."""
+
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.latency = float(self.options.get('LATENCY', 0))
+
+    def _wait(self, timeout):
+        if self.latency:
+            time.sleep(min(self.latency, timeout) if timeout is not None else self.latency)
+            if timeout is not None and self.latency > timeout:
+                raise TimeoutError("The local provider timed out")
+
+    async def _await(self, timeout, latency=None):
+        latency = self.latency if latency is None else latency
+        if latency:
+            await asyncio.sleep(min(latency, timeout) if timeout is not None else latency)
+            if timeout is not None and latency > timeout:
+                raise TimeoutError("The local provider timed out")
+
+    def score_paragraphs(self, paragraphs, labels, timeout=None):
+        self._wait(timeout)
+        return self._scores(paragraphs, labels)
+
+    async def ascore_paragraphs(self, paragraphs, labels, timeout=None):
+        await self._await(timeout)
+        return self._scores(paragraphs, labels)
+
+    def _scores(self, paragraphs, labels):
+        results = []
+        for paragraph in paragraphs:
+            evaluations = {}
+            for label, rule in labels.items():
+                score = _stable_number(paragraph, rule.text, low=40)
+                suggestion = '' if score == 100 else f"Apply the rule \"{rule.text}\" more closely in this paragraph."
+                evaluations[label] = (score, suggestion)
+            results.append(evaluations)
+        return results
+
+    def sync_article(self, best_article, normal_article, timeout=None):
+        self._wait(timeout)
+        return self._sync(best_article, normal_article)
+
+    async def async_article(self, best_article, normal_article, timeout=None):
+        await self._await(timeout)
+        return self._sync(best_article, normal_article)
+
+    async def astream_sync(self, best_article, normal_article, timeout=None):
+        # Half the latency before the level, the rest spread over the suggestion's words
+        level, suggestion = self._sync(best_article, normal_article)
+        words = suggestion.split(' ')
+        await self._await(timeout, self.latency / 2)
+        yield 'level', level
+        for index, word in enumerate(words):
+            await self._await(timeout, self.latency / 2 / len(words))
+            yield 'token', word if index == 0 else ' ' + word
+
+    def _sync(self, best_article, normal_article):
+        exemplar = stylometry.extract_features(best_article)
+        vector = stylometry.extract_features(normal_article)
+        return int(stylometry.sync_level(exemplar, vector)[0]), stylometry.suggestion(exemplar, vector)
@@ -0,0 +1,164 @@
+import json
+import threading
+
+from .base import BaseProvider
+from .streaming import SyncArgumentsParser
+from .tools import SCORE_PARAGRAPHS_TOOL, SYNC_ARTICLE_TOOL
+
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+
+class OpenAIProvider(BaseProvider):
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.model = self.options.get('MODEL', 'gpt-4o')
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def _client_options(self, http_client_class):
+        import httpx
+
+        max_connections = self.options.get('MAX_CONNECTIONS', 20)
+        return {
+            'timeout': self.options.get('TIMEOUT', 60),
+            # Retries are done by modules.llm.guard, which shares its backoff across workers
+            'max_retries': 0,
+            'http_client': http_client_class(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+            ),
+        }
+
+    @property
+    def client(self):
+        # Built on first use, after gunicorn forked, and shared by every thread of the process
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import DefaultHttpxClient, OpenAI
+
+                    self._client = OpenAI(**self._client_options(DefaultHttpxClient))
+        return self._client
+
+    @property
+    def async_client(self):
+        # ASGI workers run one event loop per process, so one async client serves every request
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+                    self._async_client = AsyncOpenAI(**self._client_options(DefaultAsyncHttpxClient))
+        return self._async_client
+
+    def is_retryable(self, error):
+        import openai
+
+        if isinstance(error, openai.APIConnectionError):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+        return super().is_retryable(error)
+
+    def _tool_arguments(self, completion, tool):
+        tool_calls = completion.choices[0].message.tool_calls
+
+        if tool_calls and tool_calls[0].function.name == tool["function"]["name"]:
+            try:
+                return json.loads(tool_calls[0].function.arguments)
+            except ValueError:
+                return None
+        return None
+
+    def call_tool(self, messages, tool, timeout=None):
+        client = self.client if timeout is None else self.client.with_options(timeout=timeout)
+        completion = client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            tools=[tool],
+        )
+        return self._tool_arguments(completion, tool)
+
+    async def acall_tool(self, messages, tool, timeout=None):
+        client = self.async_client if timeout is None else self.async_client.with_options(timeout=timeout)
+        completion = await client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            tools=[tool],
+        )
+        return self._tool_arguments(completion, tool)
+
+    def score_messages(self, paragraphs, labels):
+        rules_text = "\n".join(f"[{label}] {rule.text}" for label, rule in labels.items())
+        system_message = f"Trigger the score_paragraphs function no need for reply. You rate each paragraph of the user article separately against each of these rules:\n{rules_text}"
+        numbered = "\n\n".join(f"[{index}] {paragraph}" for index, paragraph in enumerate(paragraphs, 1))
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": numbered},
+            {"role": "system", "content": f"trigger score_paragraphs function with a score for every rule on each of the {len(paragraphs)} numbered paragraphs"},
+        ]
+
+    def parse_scores(self, arguments_dict, count):
+        if arguments_dict is None:
+            return None
+        try:
+            results = {}
+            for item in arguments_dict['paragraphs']:
+                results[item['index']] = {
+                    entry['rule']: (entry['score'], entry.get('suggestion', ''))
+                    for entry in item['rules']
+                }
+        except (KeyError, TypeError):
+            return None
+        return [results.get(index, {}) for index in range(1, count + 1)]
+
+    def sync_messages(self, best_article, normal_article):
+        return [
+            {"role": "system", "content": "Give me the best_article:"},
+            {"role": "user", "content": best_article},
+            {"role": "system", "content": "Now Give me the normal article:"},
+            {"role": "user", "content": normal_article},
+            {"role": "system", "content": "Score how close is the writing style of normal_article to best_article. trigger sync_article function 100 percent of the time"},
+        ]
+
+    def parse_sync(self, arguments_dict):
+        if arguments_dict is None or 'sync_level' not in arguments_dict:
+            return None, None
+        return arguments_dict['sync_level'], arguments_dict.get('sync_suggestion', '')
+
+    def score_paragraphs(self, paragraphs, labels, timeout=None):
+        arguments_dict = self.call_tool(self.score_messages(paragraphs, labels), SCORE_PARAGRAPHS_TOOL, timeout)
+        return self.parse_scores(arguments_dict, len(paragraphs))
+
+    async def ascore_paragraphs(self, paragraphs, labels, timeout=None):
+        arguments_dict = await self.acall_tool(self.score_messages(paragraphs, labels), SCORE_PARAGRAPHS_TOOL, timeout)
+        return self.parse_scores(arguments_dict, len(paragraphs))
+
+    def sync_article(self, best_article, normal_article, timeout=None):
+        arguments_dict = self.call_tool(self.sync_messages(best_article, normal_article), SYNC_ARTICLE_TOOL, timeout)
+        return self.parse_sync(arguments_dict)
+
+    async def async_article(self, best_article, normal_article, timeout=None):
+        arguments_dict = await self.acall_tool(self.sync_messages(best_article, normal_article), SYNC_ARTICLE_TOOL, timeout)
+        return self.parse_sync(arguments_dict)
+
+    async def astream_sync(self, best_article, normal_article, timeout=None):
+        client = self.async_client if timeout is None else self.async_client.with_options(timeout=timeout)
+        stream = await client.chat.completions.create(
+            model=self.model,
+            messages=self.sync_messages(best_article, normal_article),
+            tools=[SYNC_ARTICLE_TOOL],
+            tool_choice={"type": "function", "function": {"name": "sync_article"}},
+            stream=True,
+        )
+        parser = SyncArgumentsParser()
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.tool_calls:
+                continue
+            function = chunk.choices[0].delta.tool_calls[0].function
+            if function and function.arguments:
+                for event in parser.feed(function.arguments):
+                    yield event
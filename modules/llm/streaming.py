@@ -0,0 +1,62 @@
+import json
+import re
+
+SYNC_LEVEL_RE = re.compile(r'"sync_level"\s*:\s*(\d+)\s*[,}]')
+SUGGESTION_START_RE = re.compile(r'"sync_suggestion"\s*:\s*"')
+
+
+class SyncArgumentsParser:
+    """Pick the sync level and the suggestion text out of streamed sync_article tool arguments.
+
+    feed() takes the next fragment of the JSON arguments and returns the new
+    ('level', int) and ('token', str) events it completes.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.level = None
+        self.suggestion_start = None
+        self.position = None
+        self.finished = False
+
+    def feed(self, fragment):
+        self.buffer += fragment
+        events = []
+        if self.level is None:
+            match = SYNC_LEVEL_RE.search(self.buffer)
+            if match:
+                self.level = int(match.group(1))
+                events.append(('level', self.level))
+        if self.suggestion_start is None:
+            match = SUGGESTION_START_RE.search(self.buffer)
+            if match:
+                self.suggestion_start = self.position = match.end()
+        if self.suggestion_start is not None and not self.finished:
+            text = self._decode()
+            if text:
+                events.append(('token', text))
+        return events
+
+    def _decode(self):
+        # Decode up to the last complete character, an escape may be split across fragments
+        end = self.position
+        while end < len(self.buffer):
+            char = self.buffer[end]
+            if char == '"':
+                self.finished = True
+                break
+            if char == '\\':
+                length = 6 if self.buffer[end + 1:end + 2] == 'u' else 2
+                if end + length > len(self.buffer):
+                    break
+                end += length
+            else:
+                end += 1
+        text = json.loads('"' + self.buffer[self.position:end] + '"')
+        if text and '\ud800' <= text[-1] <= '\udbff':
+            # Wait for the other half of a surrogate pair
+            end -= 6
+            text = text[:-1]
+        self.position = end
+        return text
+
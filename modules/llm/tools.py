@@ -0,0 +1,69 @@
+SCORE_PARAGRAPHS_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "score_paragraphs",
+        "description": "this function always triggers. this gives every numbered paragraph a score for every rule and a suggestion on how to improve the score",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "paragraphs": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {
+                                "type": "integer",
+                                "description": "The number of the paragraph in square brackets.",
+                            },
+                            "rules": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "rule": {
+                                            "type": "string",
+                                            "description": "The label of the rule in square brackets, like R1.",
+                                        },
+                                        "score": {
+                                            "type": "integer",
+                                            "description": "Score of the paragraph on how good it follows this rule from 1 to 100. 100 is perfect.",
+                                        },
+                                        "suggestion": {
+                                            "type": "string",
+                                            "description": "Suggestion to the writer on how to follow this rule better in this paragraph. use easy to understand words. leave empty if the score is perfect",
+                                        },
+                                    },
+                                    "required": ["rule", "score"],
+                                },
+                            },
+                        },
+                        "required": ["index", "rules"],
+                    },
+                },
+            },
+            "required": ["paragraphs"],
+        },
+    },
+}
+
+SYNC_ARTICLE_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "sync_article",
+        "description": "This function triggers 100 percent of the time. Score how close is the writing style of normal_article to best_article and give tips on how to improve the score.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sync_level": {
+                    "type": "integer",
+                    "description": "Score how close is the writing style of normal_article to best_article from 1 to 100. 100 is perfect.",
+                },
+                "sync_suggestion": {
+                    "type": "string",
+                    "description": "Give suggestion to the writer on how to make the writing style of normal_article more close to the style of best_article. dont mention normal_article and best_article. use easy to understand words. just congratulate if the score is perfect",
+                },
+            },
+            "required": ["sync_level"],
+        },
+    },
+}
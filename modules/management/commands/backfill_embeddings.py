@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from modules.models import Article
+from modules.vectorindex import EMBEDDING_FIELDS, update_embeddings
+
+
+class Command(BaseCommand):
+    help = "Embed the articles imported in bulk or stored before embeddings existed, for the similar article search"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Number of articles embedded and written at a time")
+        parser.add_argument('--all', action='store_true',
+                            help="Also check articles that have an embedding, re-embedding those edited since")
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.only(*EMBEDDING_FIELDS).order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(embedding__isnull=True)
+        total = queryset.count()
+        embedded = processed = 0
+
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            embedded += len(update_embeddings(chunk))
+            processed += len(chunk)
+            self.stdout.write(f"{processed}/{total} articles, {embedded} embedded")
+
+        self.stdout.write(self.style.SUCCESS(f"Embedded {embedded} articles"))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+
+from modules.duplicates import find_duplicates, update_signatures
+from modules.models import Article
+from modules.scoring import skip_duplicate
+
+SIGNATURE_FIELDS = (
+    'content', 'updated_at', 'minhash', 'minhash_content_hash', 'minhash_at', 'duplicate_of', 'duplicate_similarity',
+)
+
+
+class Command(BaseCommand):
+    help = "Compute the MinHash signatures of existing articles and find the near duplicates among them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of articles read and written at a time")
+        parser.add_argument('--recheck', action='store_true',
+                            help="Look for an original again for articles whose signature is already current")
+        parser.add_argument('--flag', action='store_true',
+                            help="Also mark the near duplicates found and clear their scores")
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.only(*SIGNATURE_FIELDS).order_by('pk')
+        total = queryset.count()
+        signed = found = flagged = 0
+
+        # Every signature and bucket is stored first, a copy may predate its original's id
+        changed = []
+        processed = 0
+        for chunk in self._chunks(queryset, options['batch_size']):
+            changed += [article.pk for article in update_signatures(chunk, batch_size=options['batch_size'])]
+            processed += len(chunk)
+            self.stdout.write(f"{processed}/{total} articles, {len(changed)} signatures computed")
+        signed = len(changed)
+
+        if options['recheck']:
+            checked = self._chunks(queryset, options['batch_size'])
+        else:
+            checked = (list(queryset.filter(pk__in=changed[start:start + options['batch_size']]))
+                       for start in range(0, len(changed), options['batch_size']))
+        for chunk in checked:
+            duplicates = find_duplicates(chunk)
+            found += len(duplicates)
+            if options['flag'] and duplicates:
+                for article in Article.objects.select_related('module').filter(pk__in=[a.pk for a in duplicates]):
+                    flagged += skip_duplicate(article)
+        self.stdout.write(f"{found} near duplicates found")
+
+        message = f"Computed {signed} signatures and found {found} near duplicates"
+        if options['flag']:
+            message += f", {flagged} flagged"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def _chunks(self, queryset, batch_size):
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1].pk
+            yield chunk
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from modules.exporter import FORMATS, export_lines
+from modules.models import Article
+
+
+class Command(BaseCommand):
+    help = "Export article scores, sync levels and feedback as CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', default='-',
+                            help="File to write, - for standard output")
+        parser.add_argument('--module', type=int, action='append', dest='modules', default=[],
+                            help="Only export articles of this module id (repeatable)")
+        parser.add_argument('--include-content', choices=['html', 'plain'],
+                            help="Also export the article content as HTML or as the plain text sent to the model")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Number of rows fetched from the database at a time")
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.all()
+        if options['modules']:
+            queryset = queryset.filter(module_id__in=options['modules'])
+        include_content = {'html': True, 'plain': 'plain'}.get(options['include_content'], False)
+
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='', encoding='utf-8')
+        count = 0
+        try:
+            for line in export_lines(queryset, options['format'], include_content, options['chunk_size']):
+                output.write(line)
+                count += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        if output is not sys.stdout:
+            rows = count - 1 if options['format'] == 'csv' else count
+            self.stdout.write(self.style.SUCCESS(f"Exported {rows} articles to {options['output']}"))
@@ -0,0 +1,46 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.importer import FORMATS, guess_format, import_articles, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import articles from a JSONL or CSV file with title, content, module and writer columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, - for standard input")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="File format, guessed from the extension by default")
+        parser.add_argument('--module',
+                            help="Module id or title for rows without a module")
+        parser.add_argument('--writer',
+                            help="Writer username or id for rows without a writer")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of articles inserted per query")
+        parser.add_argument('--defer-scoring', action='store_true',
+                            help="Don't queue scoring jobs, score later with rescore_articles --stale")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or guess_format(path)
+        started = time.monotonic()
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            result = import_articles(
+                read_rows(stream, format),
+                writer=options['writer'],
+                module=options['module'],
+                batch_size=max(1, options['batch_size']),
+                defer_scoring=options['defer_scoring'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(f"{result} in {time.monotonic() - started:.1f}s"))
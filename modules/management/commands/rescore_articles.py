@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+
+from modules.exemplars import note_article_score
+from modules.models import Article
+from modules.paragraphs import save_rule_scores
+from modules.rulematrix import stale_articles
+from modules.scoring import SCORE_FIELDS, score_article
+from modules.search import index_articles
+
+
+class RateLimiter:
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0, slot - now))
+
+
+class Command(BaseCommand):
+    help = "Re-score existing articles, for example after writing rules changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', type=int, action='append', dest='modules', default=[],
+                            help="Only rescore articles of this module id (repeatable)")
+        parser.add_argument('--writer', action='append', dest='writers', default=[],
+                            help="Only rescore articles by this writer username or id (repeatable)")
+        parser.add_argument('--stale', action='store_true',
+                            help="Only rescore articles scored against older rules or not scored at all")
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help="Number of articles scored at the same time")
+        parser.add_argument('--rate', type=float, default=0,
+                            help="Maximum articles started per second, 0 for no limit")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Number of results written per bulk update")
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, 'rescore_checkpoint.json'),
+                            help="File used to record progress")
+        parser.add_argument('--resume', action='store_true',
+                            help="Continue after the last article recorded in the checkpoint file")
+        parser.add_argument('--bypass-cache', action='store_true',
+                            help="Always call the model, ignoring stored results for identical inputs")
+
+    def handle(self, *args, **options):
+        self.options = options
+        queryset = self.get_queryset()
+
+        start_after = 0
+        if options['resume']:
+            start_after = self.read_checkpoint()
+            queryset = queryset.filter(pk__gt=start_after)
+
+        total = queryset.count()
+        if not total:
+            self.stdout.write("Nothing to rescore")
+            self.clear_checkpoint()
+            return
+        self.stdout.write(f"Rescoring {total} articles" + (f" after #{start_after}" if start_after else ""))
+
+        self.limiter = RateLimiter(options['rate'])
+        self.started = time.monotonic()
+        self.total = total
+        self.scored = 0
+        self.failed = 0
+        self.pending = []
+        self.submitted = deque()
+        self.finished = set()
+        self.checkpoint = start_after
+
+        concurrency = max(1, options['concurrency'])
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for article in self.stream(queryset, options['batch_size']):
+                # Keep the iterator from racing ahead of the workers
+                while len(in_flight) >= concurrency * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self.collect(done)
+                self.submitted.append(article.pk)
+                in_flight.add(executor.submit(self.score, article))
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                self.collect(done)
+        self.flush()
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {self.scored} articles in {elapsed:.0f}s, {self.failed} failed"
+        ))
+        if not self.failed:
+            self.clear_checkpoint()
+
+    def get_queryset(self):
+        queryset = Article.objects.select_related('module')
+        if self.options['modules']:
+            queryset = queryset.filter(module_id__in=self.options['modules'])
+        if self.options['writers']:
+            writer_filter = Q()
+            for writer in self.options['writers']:
+                writer_filter |= Q(writer_id=writer) if writer.isdigit() else Q(writer__username=writer)
+            queryset = queryset.filter(writer_filter)
+        if self.options['stale']:
+            queryset = queryset.filter(~Q(status=Article.STATUS_DONE) | Q(pk__in=stale_articles(queryset).values('pk')))
+        return queryset
+
+    def stream(self, queryset, chunk_size):
+        # Page by primary key rather than holding one cursor open for the whole run,
+        # on SQLite an open read cursor blocks the writes the scoring threads make
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+            if not chunk:
+                return
+            yield from chunk
+            last_pk = chunk[-1].pk
+
+    def score(self, article):
+        self.limiter.wait()
+        try:
+            score_article(article, commit=False, use_cache=not self.options['bypass_cache'])
+            return article, None
+        except Exception as e:
+            return article, e
+        finally:
+            connections.close_all()
+
+    def collect(self, futures):
+        for future in futures:
+            article, error = future.result()
+            if error:
+                # Failed articles keep their old score and show up again with --stale
+                self.failed += 1
+                self.finished.add(article.pk)
+                self.stderr.write(f"Failed to score article #{article.pk}: {error}")
+                continue
+            self.pending.append(article)
+        if len(self.pending) >= self.options['batch_size']:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            Article.objects.bulk_update(self.pending, SCORE_FIELDS, batch_size=self.options['batch_size'])
+            index_articles(self.pending)
+            for article in self.pending:
+                save_rule_scores(article, article.rule_results)
+                note_article_score(article)
+            self.scored += len(self.pending)
+            self.finished.update(article.pk for article in self.pending)
+            self.pending = []
+
+        # Only advance the checkpoint past articles whose results are written,
+        # anything still in flight gets picked up again by --resume
+        while self.submitted and self.submitted[0] in self.finished:
+            self.checkpoint = self.submitted.popleft()
+            self.finished.discard(self.checkpoint)
+        self.write_checkpoint()
+        self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        processed = self.scored + self.failed
+        rate = processed / elapsed if elapsed else 0
+        remaining = self.total - processed
+        eta = remaining / rate if rate else 0
+        self.stdout.write(
+            f"{processed}/{self.total} articles, {rate:.2f}/s, ETA {int(eta // 60)}m{int(eta % 60):02d}s"
+        )
+
+    def read_checkpoint(self):
+        try:
+            with open(self.options['checkpoint']) as f:
+                return int(json.load(f)['last_pk'])
+        except FileNotFoundError:
+            raise CommandError(f"No checkpoint found at {self.options['checkpoint']}")
+
+    def write_checkpoint(self):
+        with open(self.options['checkpoint'], 'w') as f:
+            json.dump({'last_pk': self.checkpoint}, f)
+
+    def clear_checkpoint(self):
+        if os.path.exists(self.options['checkpoint']):
+            os.remove(self.options['checkpoint'])
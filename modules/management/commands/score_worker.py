@@ -0,0 +1,96 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from modules.cache import cache_stats
+from modules.jobs import claim_job, complete_job, enqueue_resyncs, extend_job, fail_job, postpone_job
+from modules.llm.guard import ProviderUnavailable
+from modules.models import ScoringJob
+from modules.rulematrix import refresh_rule_scores
+from modules.scoring import score_article, sync_article
+
+
+class Command(BaseCommand):
+    help = "Process queued article scoring jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.SCORING_WORKER_CONCURRENCY,
+                            help="Number of jobs processed at the same time")
+        parser.add_argument('--visibility-timeout', type=int, default=settings.SCORING_JOB_VISIBILITY_TIMEOUT,
+                            help="Seconds before a job claimed by a dead worker can be picked up again")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is drained instead of polling forever")
+        parser.add_argument('--bypass-cache', action='store_true',
+                            help="Always call the model, ignoring stored results for identical inputs")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.options = options
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop.set())
+
+        concurrency = max(1, options['concurrency'])
+        self.stdout.write(f"Scoring worker started with concurrency {concurrency}")
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(self.work_loop, f"{base_id}:{slot}") for slot in range(concurrency)]
+            for future in futures:
+                future.result()
+        stats = cache_stats()
+        self.stdout.write(
+            f"Scoring worker stopped (cache hits {stats['hits']}, misses {stats['misses']}, "
+            f"shared in-flight {stats['shared']}, "
+            f"stored results {stats['stored_entries']})"
+        )
+
+    def work_loop(self, worker_id):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim_job(worker_id, self.options['visibility_timeout'])
+                if job is None:
+                    if self.options['once']:
+                        break
+                    self.stop.wait(self.options['poll_interval'])
+                    continue
+                self.process(job)
+        finally:
+            connection.close()
+
+    def process(self, job):
+        started = time.monotonic()
+        use_cache = not self.options['bypass_cache']
+        try:
+            if job.kind == ScoringJob.KIND_CASCADE:
+                queued = enqueue_resyncs(job.module_id)
+            elif job.kind == ScoringJob.KIND_RULES:
+                # A full refresh outlasts the visibility timeout, the lock is renewed after every batch
+                refreshed = refresh_rule_scores(keep_going=lambda: extend_job(job, self.options['visibility_timeout']))
+            elif job.kind == ScoringJob.KIND_SYNC:
+                sync_article(job.article, use_cache=use_cache)
+            else:
+                score_article(job.article, use_cache=use_cache)
+        except ProviderUnavailable as e:
+            postpone_job(job, e, e.retry_after)
+            self.stderr.write(f"{job} postponed for {e.retry_after:.0f}s: {e}")
+            return
+        except Exception as e:
+            fail_job(job, e)
+            self.stderr.write(f"{job} failed on attempt {job.attempts}: {e}")
+            return
+        complete_job(job)
+        if job.kind == ScoringJob.KIND_CASCADE:
+            self.stdout.write(f"{job} queued {queued} re-syncs")
+        elif job.kind == ScoringJob.KIND_RULES:
+            self.stdout.write(f"{job} refreshed {refreshed} articles in {time.monotonic() - started:.1f}s")
+        else:
+            self.stdout.write(f"{job} finished in {time.monotonic() - started:.1f}s")
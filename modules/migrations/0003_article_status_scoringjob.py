@@ -0,0 +1,89 @@
+# Generated by Django 4.2 on 2026-10-18 07:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def mark_scored_articles_done(apps, schema_editor):
+    Article = apps.get_model("modules", "Article")
+    Article.objects.filter(score__isnull=False).update(status="done")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0002_alter_article_options_article_sync_level_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("done", "Scored"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ScoringJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("max_attempts", models.PositiveIntegerField(default=5)),
+                (
+                    "available_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("locked_by", models.CharField(blank=True, max_length=100)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scoring_jobs",
+                        to="modules.article",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["available_at", "pk"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="scoringjob",
+            index=models.Index(
+                fields=["status", "available_at"], name="modules_sco_status_2d4442_idx"
+            ),
+        ),
+        migrations.RunPython(mark_scored_articles_done, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0004_airesult"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="rules_version",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+    ]
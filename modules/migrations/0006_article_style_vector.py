@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0005_article_rules_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="style_vector",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 07:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_best_articles(apps, schema_editor):
+    Article = apps.get_model("modules", "Article")
+    Module = apps.get_model("modules", "Module")
+    for module in Module.objects.all():
+        best = (
+            Article.objects.filter(module=module, score__isnull=False)
+            .order_by("-score", "pk")
+            .first()
+        )
+        if best:
+            module.best_article = best
+            module.best_score = best.score
+            module.save(update_fields=["best_article", "best_score"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0006_article_style_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="module",
+            name="best_article",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="modules.article",
+            ),
+        ),
+        migrations.AddField(
+            model_name="module",
+            name="best_score",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["module", "-score"], name="article_module_score_idx"
+            ),
+        ),
+        migrations.RunPython(set_best_articles, migrations.RunPython.noop),
+    ]
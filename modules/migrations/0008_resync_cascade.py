@@ -0,0 +1,74 @@
+# Generated by Django 4.2 on 2026-10-18 07:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def prioritize_score_jobs(apps, schema_editor):
+    ScoringJob = apps.get_model("modules", "ScoringJob")
+    ScoringJob.objects.filter(kind="score").update(priority=20)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0007_module_best_article"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="scoringjob",
+            options={"ordering": ["-priority", "available_at", "pk"]},
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="synced_revision",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="module",
+            name="best_revision",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scoringjob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("score", "Score"),
+                    ("sync", "Re-sync"),
+                    ("cascade", "Re-sync cascade"),
+                ],
+                default="score",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="scoringjob",
+            name="module",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="scoring_jobs",
+                to="modules.module",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scoringjob",
+            name="priority",
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="scoringjob",
+            name="article",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="scoring_jobs",
+                to="modules.article",
+            ),
+        ),
+        migrations.RunPython(prioritize_score_jobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2 on 2026-10-18 07:14
+
+import ckeditor.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0008_resync_cascade"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleRevision",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content", ckeditor.fields.RichTextField()),
+                ("content_hash", models.CharField(max_length=64)),
+                ("paragraph_hashes", models.JSONField(default=list)),
+                ("rules_version", models.CharField(blank=True, max_length=16)),
+                ("score", models.IntegerField(blank=True, null=True)),
+                ("feedback", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-created_at", "-pk"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ParagraphEvaluation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("paragraph_hash", models.CharField(max_length=64)),
+                ("rules_version", models.CharField(max_length=16)),
+                ("score", models.IntegerField()),
+                ("suggestion", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="paragraphevaluation",
+            constraint=models.UniqueConstraint(
+                fields=("paragraph_hash", "rules_version"),
+                name="unique_paragraph_evaluation",
+            ),
+        ),
+        migrations.AddField(
+            model_name="articlerevision",
+            name="article",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="revisions",
+                to="modules.article",
+            ),
+        ),
+    ]
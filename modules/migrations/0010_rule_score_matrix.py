@@ -0,0 +1,99 @@
+# Generated by Django 4.2 on 2026-10-18 08:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clear_paragraph_evaluations(apps, schema_editor):
+    # Evaluations against a whole rule set can't be split per rule, they are recomputed on demand
+    ParagraphEvaluation = apps.get_model("modules", "ParagraphEvaluation")
+    ParagraphEvaluation.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rules", "0002_writingrule_weight"),
+        ("modules", "0009_article_revisions"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_paragraph_evaluations, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name="paragraphevaluation",
+            name="unique_paragraph_evaluation",
+        ),
+        migrations.RemoveField(
+            model_name="paragraphevaluation",
+            name="rules_version",
+        ),
+        migrations.AddField(
+            model_name="paragraphevaluation",
+            name="rule_hash",
+            field=models.CharField(default="", max_length=16),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name="paragraphevaluation",
+            constraint=models.UniqueConstraint(
+                fields=("paragraph_hash", "rule_hash"),
+                name="unique_paragraph_rule_evaluation",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="scoringjob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("score", "Score"),
+                    ("sync", "Re-sync"),
+                    ("cascade", "Re-sync cascade"),
+                    ("rules", "Rule change refresh"),
+                ],
+                default="score",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ArticleRuleScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.IntegerField()),
+                ("suggestion", models.TextField(blank=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rule_scores",
+                        to="modules.article",
+                    ),
+                ),
+                (
+                    "rule",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="article_scores",
+                        to="rules.writingrule",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["score"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="articlerulescore",
+            constraint=models.UniqueConstraint(
+                fields=("article", "rule"), name="unique_article_rule_score"
+            ),
+        ),
+    ]
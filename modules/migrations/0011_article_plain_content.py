@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0010_rule_score_matrix"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="content_tokens",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="plain_content",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="plain_content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="plain_tokens",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
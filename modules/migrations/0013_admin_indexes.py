@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0012_inflightcall"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["module", "title"], name="article_module_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["writer", "title"], name="article_writer_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["status", "title"], name="article_status_title_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(fields=["created_at"], name="article_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["module", "-updated_at"], name="article_module_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="module",
+            index=models.Index(
+                fields=["lead_writer", "-created_at"], name="module_writer_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="module",
+            index=models.Index(fields=["created_at"], name="module_created_idx"),
+        ),
+    ]
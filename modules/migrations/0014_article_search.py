@@ -0,0 +1,62 @@
+from django.db import migrations
+
+from modules.text import split_paragraphs
+
+TABLE = "modules_article_search"
+DOCUMENT = (
+    "setweight(to_tsvector('english', %s), 'A') || "
+    "setweight(to_tsvector('english', %s), 'B') || "
+    "setweight(to_tsvector('english', %s), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5(title, content, feedback, tokenize='porter unicode61')"
+        )
+        insert = f"INSERT INTO {TABLE} (rowid, title, content, feedback) VALUES (%s, %s, %s, %s)"
+    elif connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE} ("
+            "article_id bigint PRIMARY KEY REFERENCES modules_article (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(f"CREATE INDEX {TABLE}_document_idx ON {TABLE} USING gin (document)")
+        insert = f"INSERT INTO {TABLE} (article_id, document) VALUES (%s, {DOCUMENT})"
+    else:
+        return
+
+    Article = apps.get_model("modules", "Article")
+    articles = Article.objects.values_list("pk", "title", "content", "feedback").order_by("pk")
+    last_pk = 0
+    with connection.cursor() as cursor:
+        while True:
+            chunk = list(articles.filter(pk__gt=last_pk)[:500])
+            if not chunk:
+                break
+            cursor.executemany(
+                insert,
+                [
+                    (pk, title or "", "\n".join(split_paragraphs(content)), feedback or "")
+                    for pk, title, content, feedback in chunk
+                ],
+            )
+            last_pk = chunk[-1][0]
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0013_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
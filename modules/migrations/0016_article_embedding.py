@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0015_article_minhash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="embedded_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="embedding",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="embedding_content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["module", "embedded_at"], name="article_module_embedded_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 07:54
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_minhash_at(apps, schema_editor):
+    # The oldest revision with the signed text, or the last save for texts never scored
+    Article = apps.get_model("modules", "Article")
+    ArticleRevision = apps.get_model("modules", "ArticleRevision")
+    first_revision = (
+        ArticleRevision.objects.filter(
+            article=OuterRef("pk"), content_hash=OuterRef("minhash_content_hash")
+        )
+        .order_by("created_at")
+        .values("created_at")[:1]
+    )
+    Article.objects.exclude(minhash_content_hash="").update(
+        minhash_at=Coalesce(Subquery(first_revision), F("updated_at"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0016_article_embedding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="minhash_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(set_minhash_at, migrations.RunPython.noop),
+    ]
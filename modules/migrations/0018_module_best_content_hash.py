@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 08:04
+
+from django.db import migrations, models
+
+from modules.cache import content_hash
+
+
+def set_best_content_hashes(apps, schema_editor):
+    Module = apps.get_model("modules", "Module")
+    for module in Module.objects.filter(best_article__isnull=False).select_related(
+        "best_article"
+    ):
+        module.best_content_hash = content_hash(module.best_article.content)
+        module.save(update_fields=["best_content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("modules", "0017_article_minhash_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="module",
+            name="best_content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(set_best_content_hashes, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,43 @@
 from django.urls import reverse
 from django.db import models
+from django.utils import timezone
 from ckeditor.fields import RichTextField
 from django.contrib.auth.models import User
+from rules.models import WritingRule
 
 class Module(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     lead_writer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lead_modules')
+    best_article = models.ForeignKey('Article', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    best_score = models.IntegerField(null=True, blank=True)
+    best_revision = models.PositiveIntegerField(default=0)
+    # Content of the best article when best_revision was last bumped
+    best_content_hash = models.CharField(max_length=64, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['lead_writer', '-created_at'], name='module_writer_created_idx'),
+            models.Index(fields=['created_at'], name='module_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 class Article(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_DUPLICATE = 'duplicate'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Scored'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_DUPLICATE, 'Near duplicate'),
+    ]
+
     title = models.CharField(max_length=255)
     content = RichTextField()
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='articles')
@@ -24,12 +48,175 @@ class Article(models.Model):
     feedback = models.TextField(blank=True, null=True)
     sync_level = models.IntegerField(null=True, blank=True)
     sync_suggestion = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rules_version = models.CharField(max_length=16, blank=True)
+    style_vector = models.BinaryField(null=True, blank=True, editable=False)
+    synced_revision = models.PositiveIntegerField(null=True, blank=True)
+    plain_content = models.TextField(blank=True, editable=False)
+    plain_content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    content_tokens = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    plain_tokens = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # MinHash of the text, see modules/duplicates.py
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
+    minhash_content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # When this text was first seen, the earlier of two near copies is the original
+    minhash_at = models.DateTimeField(null=True, blank=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='near_copies'
+    )
+    duplicate_similarity = models.FloatField(null=True, blank=True, editable=False)
+    # Packed float32 embedding, see modules/vectorindex.py
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
+    embedding_content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    embedded_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def get_admin_url(self):
         return reverse('admin:%s_%s_change' % (self._meta.app_label, self._meta.model_name), args=[self.pk])
 
     class Meta:
         ordering = ['-title']
+        indexes = [
+            models.Index(fields=['module', '-score'], name='article_module_score_idx'),
+            # Admin list filters combined with the default title ordering
+            models.Index(fields=['module', 'title'], name='article_module_title_idx'),
+            models.Index(fields=['writer', 'title'], name='article_writer_title_idx'),
+            models.Index(fields=['status', 'title'], name='article_status_title_idx'),
+            models.Index(fields=['created_at'], name='article_created_idx'),
+            models.Index(fields=['module', '-updated_at'], name='article_module_updated_idx'),
+            models.Index(fields=['module', 'embedded_at'], name='article_module_embedded_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+class ArticleBand(models.Model):
+    """One LSH band bucket of an article's MinHash, articles sharing a bucket are near duplicate candidates."""
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='bands')
+    bucket = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.article_id}: {self.bucket}"
+
+class ArticleRevision(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='revisions')
+    content = RichTextField()
+    content_hash = models.CharField(max_length=64)
+    paragraph_hashes = models.JSONField(default=list)
+    rules_version = models.CharField(max_length=16, blank=True)
+    score = models.IntegerField(null=True, blank=True)
+    feedback = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-pk']
+
+    def __str__(self):
+        return f"{self.article} ({self.created_at:%Y-%m-%d %H:%M})"
+
+class ParagraphEvaluation(models.Model):
+    paragraph_hash = models.CharField(max_length=64)
+    rule_hash = models.CharField(max_length=16)
+    score = models.IntegerField()
+    suggestion = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['paragraph_hash', 'rule_hash'], name='unique_paragraph_rule_evaluation'),
+        ]
+
+    def __str__(self):
+        return f"{self.paragraph_hash[:12]} ({self.score})"
+
+class ArticleRuleScore(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='rule_scores')
+    rule = models.ForeignKey(WritingRule, on_delete=models.CASCADE, related_name='article_scores')
+    score = models.IntegerField()
+    suggestion = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['score']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'rule'], name='unique_article_rule_score'),
+        ]
+
+    def __str__(self):
+        return f"{self.article} / {self.rule_id}: {self.score}"
+
+class ScoringJob(models.Model):
+    KIND_SCORE = 'score'
+    KIND_SYNC = 'sync'
+    KIND_CASCADE = 'cascade'
+    KIND_RULES = 'rules'
+    KIND_CHOICES = [
+        (KIND_SCORE, 'Score'),
+        (KIND_SYNC, 'Re-sync'),
+        (KIND_CASCADE, 'Re-sync cascade'),
+        (KIND_RULES, 'Rule change refresh'),
+    ]
+    PRIORITIES = {
+        KIND_SCORE: 20,
+        KIND_CASCADE: 10,
+        KIND_RULES: 5,
+        KIND_SYNC: 0,
+    }
+    # Imported back catalogs wait behind everything a writer is looking at
+    PRIORITY_BULK = -10
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_SCORE)
+    priority = models.SmallIntegerField(default=0)
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, null=True, blank=True, related_name='scoring_jobs')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, null=True, blank=True, related_name='scoring_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-priority', 'available_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job #{self.pk} for {self.article or self.module or 'all articles'}"
+
+class InFlightCall(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.owner})"
+
+class AIResult(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=20)
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = 'AI result'
+
+    def __str__(self):
+        return f"{self.kind} {self.key[:12]}"
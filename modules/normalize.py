@@ -0,0 +1,19 @@
+from .cache import content_hash
+from .models import Article
+from .text import count_tokens, prompt_text
+
+NORMALIZE_FIELDS = ['plain_content', 'plain_content_hash', 'content_tokens', 'plain_tokens']
+
+
+def normalize_article(article):
+    """Return the text the model sees for the article, converting its HTML once per content change."""
+    digest = content_hash(article.content)
+    if article.plain_content_hash != digest:
+        article.plain_content = prompt_text(article.content)
+        article.plain_content_hash = digest
+        article.content_tokens = count_tokens(article.content)
+        article.plain_tokens = count_tokens(article.plain_content)
+        if article.pk:
+            # Written on its own, like the style vector, so a concurrent content edit only makes it stale
+            Article.objects.filter(pk=article.pk).update(**{field: getattr(article, field) for field in NORMALIZE_FIELDS})
+    return article.plain_content
@@ -0,0 +1,228 @@
+import asyncio
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+
+from . import pool
+from .ai import aai_check_paragraphs, ai_check_paragraphs
+from .cache import content_hash, make_key
+from .exceptions import ScoringError
+from .models import ArticleRevision, ArticleRuleScore, ParagraphEvaluation
+from .singleflight import asingle_flight, single_flight
+from .text import chunk_paragraphs, prompt_paragraphs
+
+# evaluations maps a rule hash to the (score, suggestion) of this paragraph for that rule
+ParagraphResult = namedtuple('ParagraphResult', ['index', 'text', 'hash', 'evaluations'])
+
+ALL_RULES_FOLLOWED = "Great job! Every paragraph follows the rules."
+
+
+def load_evaluations(paragraph_hashes, rule_hashes):
+    evaluations = ParagraphEvaluation.objects.filter(
+        paragraph_hash__in=set(paragraph_hashes), rule_hash__in=set(rule_hashes)
+    ).values_list('paragraph_hash', 'rule_hash', 'score', 'suggestion')
+    return {(p, r): (score, suggestion) for p, r, score, suggestion in evaluations}
+
+
+def store_evaluations(evaluations):
+    ParagraphEvaluation.objects.bulk_create(
+        [
+            ParagraphEvaluation(paragraph_hash=p, rule_hash=r, score=score, suggestion=suggestion or '')
+            for (p, r), (score, suggestion) in evaluations.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['paragraph_hash', 'rule_hash'],
+        update_fields=['score', 'suggestion'],
+    )
+
+
+def _plan_batches(missing, rules):
+    # Group paragraphs by the rules they still need, usually either new paragraphs
+    # needing every rule or every paragraph needing one changed rule
+    groups = {}
+    for (paragraph_hash, rule_hash), text in missing.items():
+        groups.setdefault(paragraph_hash, (text, set()))[1].add(rule_hash)
+    by_rules = {}
+    for paragraph_hash, (text, rule_hashes) in groups.items():
+        by_rules.setdefault(frozenset(rule_hashes), {})[paragraph_hash] = text
+
+    # Token bounded batches keep every call well inside the context window and
+    # its latency flat, long articles just fan out into more concurrent batches
+    batches = []
+    for rule_hashes, paragraphs in by_rules.items():
+        subset = [rule for rule in rules if rule.hash in rule_hashes]
+        for chunk in chunk_paragraphs(list(paragraphs.items()), key=lambda item: item[1]):
+            batches.append((chunk, subset))
+    return batches
+
+
+def _merge(outcomes):
+    fresh = {}
+    for outcome in outcomes:
+        fresh.update(outcome)
+    return fresh
+
+
+def evaluate_missing(missing, rules, use_cache=True):
+    """Ask the model for the (paragraph, rule) pairs in missing, a {(paragraph hash, rule hash): text} dict."""
+    batches = _plan_batches(missing, rules)
+    return _merge(pool.map_chunks(_evaluate_batch, [(batch, subset, use_cache) for batch, subset in batches]))
+
+
+async def aevaluate_missing(missing, rules, use_cache=True):
+    limit = asyncio.Semaphore(settings.SCORING_CHUNK_PARALLELISM)
+
+    async def evaluate(batch, subset):
+        async with limit:
+            return await _aevaluate_batch(batch, subset, use_cache)
+
+    return _merge(await asyncio.gather(*(evaluate(batch, subset) for batch, subset in _plan_batches(missing, rules))))
+
+
+def _batch_evaluations(batch, results):
+    if results is None:
+        raise ScoringError("The model did not return paragraph scores")
+    fresh = {}
+    for (paragraph_hash, _), evaluations in zip(batch, results):
+        for rule_hash, result in evaluations.items():
+            fresh[(paragraph_hash, rule_hash)] = result
+    return fresh
+
+
+def _batch_key(batch, rules):
+    paragraph_hashes = sorted(paragraph_hash for paragraph_hash, _ in batch)
+    rule_hashes = sorted(rule.hash for rule in rules)
+
+    def lookup():
+        known = load_evaluations(paragraph_hashes, rule_hashes)
+        return known if len(known) == len(paragraph_hashes) * len(rule_hashes) else None
+
+    return make_key('paragraphs', *paragraph_hashes, *rule_hashes), lookup
+
+
+def _evaluate_batch(batch, rules, use_cache=True):
+    def compute():
+        fresh = _batch_evaluations(batch, ai_check_paragraphs([text for _, text in batch], rules))
+        store_evaluations(fresh)
+        return fresh
+
+    if not use_cache:
+        return compute()
+    # The same batch being scored for another article right now is waited for, not sent twice
+    key, lookup = _batch_key(batch, rules)
+    return single_flight(key, compute, lookup)[0]
+
+
+async def _aevaluate_batch(batch, rules, use_cache=True):
+    async def compute():
+        fresh = _batch_evaluations(batch, await aai_check_paragraphs([text for _, text in batch], rules))
+        await sync_to_async(store_evaluations)(fresh)
+        return fresh
+
+    if not use_cache:
+        return await compute()
+    key, lookup = _batch_key(batch, rules)
+    return (await asingle_flight(key, compute, lookup))[0]
+
+
+def _plan_paragraphs(text, rules, use_cache):
+    paragraphs = prompt_paragraphs(text)
+    if not paragraphs:
+        raise ScoringError("The article has no text to score")
+    hashes = [content_hash(paragraph) for paragraph in paragraphs]
+    rule_hashes = [rule.hash for rule in rules.rules]
+
+    known = load_evaluations(hashes, rule_hashes) if use_cache else {}
+    missing = {
+        (paragraph_hash, rule_hash): paragraph
+        for paragraph_hash, paragraph in zip(hashes, paragraphs)
+        for rule_hash in rule_hashes
+        if (paragraph_hash, rule_hash) not in known
+    }
+    return paragraphs, hashes, rule_hashes, known, missing
+
+
+def _paragraph_results(paragraphs, hashes, rule_hashes, known):
+    return [
+        ParagraphResult(index, paragraph, paragraph_hash, {r: known[(paragraph_hash, r)] for r in rule_hashes})
+        for index, (paragraph, paragraph_hash) in enumerate(zip(paragraphs, hashes), 1)
+    ]
+
+
+def evaluate_paragraphs(text, rules, use_cache=True):
+    """Score every paragraph of the article's prompt text against every rule.
+
+    Only pairs without a stored evaluation are sent to the model.
+    """
+    paragraphs, hashes, rule_hashes, known, missing = _plan_paragraphs(text, rules, use_cache)
+    if missing:
+        known.update(evaluate_missing(missing, rules.rules, use_cache=use_cache))
+    return _paragraph_results(paragraphs, hashes, rule_hashes, known)
+
+
+async def aevaluate_paragraphs(text, rules, use_cache=True):
+    paragraphs, hashes, rule_hashes, known, missing = await sync_to_async(_plan_paragraphs)(text, rules, use_cache)
+    if missing:
+        known.update(await aevaluate_missing(missing, rules.rules, use_cache=use_cache))
+    return _paragraph_results(paragraphs, hashes, rule_hashes, known)
+
+
+def aggregate(results, rules, limit=3):
+    """Combine the paragraph x rule results into the article score, feedback and per rule scores."""
+    weights = [max(1, len(result.text.split())) for result in results]
+    total_words = sum(weights)
+
+    rule_scores = {}
+    for rule in rules.rules:
+        score = round(sum(r.evaluations[rule.hash][0] * w for r, w in zip(results, weights)) / total_words)
+        weakest = min(results, key=lambda r: r.evaluations[rule.hash][0])
+        suggestion = weakest.evaluations[rule.hash][1] if score < 100 else ''
+        rule_scores[rule] = (score, f"Paragraph {weakest.index}: {suggestion}" if suggestion else '')
+
+    # Rules weighted 0 don't count towards the score, unless every rule is
+    weights = {rule: rule.weight for rule in rules.rules} if any(rule.weight for rule in rules.rules) else {
+        rule: 1 for rule in rules.rules
+    }
+    score = round(sum(s * weights[rule] for rule, (s, _) in rule_scores.items()) / sum(weights.values()))
+
+    # Point the writer at the rules costing them the most points
+    costly = sorted(
+        ((rule, s, suggestion) for rule, (s, suggestion) in rule_scores.items() if s < 100 and suggestion),
+        key=lambda item: (100 - item[1]) * item[0].weight,
+        reverse=True,
+    )[:limit]
+    if not costly:
+        return score, ALL_RULES_FOLLOWED, rule_scores
+    feedback = " ".join(f'"{rule.text}" ({s}/100). {suggestion}' for rule, s, suggestion in costly)
+    return score, feedback, rule_scores
+
+
+def save_rule_scores(article, rule_scores):
+    # The fallback rule used when nobody wrote any rules has no row to point at
+    rows = {rule.pk: result for rule, result in rule_scores.items() if rule.pk}
+    ArticleRuleScore.objects.filter(article=article).filter(~Q(rule_id__in=list(rows))).delete()
+    ArticleRuleScore.objects.bulk_create(
+        [ArticleRuleScore(article=article, rule_id=pk, score=score, suggestion=suggestion)
+         for pk, (score, suggestion) in rows.items()],
+        update_conflicts=True,
+        unique_fields=['article', 'rule'],
+        update_fields=['score', 'suggestion', 'updated_at'],
+    )
+
+
+def record_revision(article, results, rules):
+    article_hash = content_hash(article.content)
+    latest = article.revisions.only('pk', 'content_hash').first()
+    fields = {
+        'paragraph_hashes': [result.hash for result in results],
+        'rules_version': rules.version,
+        'score': article.score,
+        'feedback': article.feedback,
+    }
+    # Re-scoring unchanged content updates the latest revision instead of adding one
+    if latest and latest.content_hash == article_hash:
+        ArticleRevision.objects.filter(pk=latest.pk).update(**fields)
+        return latest
+    return ArticleRevision.objects.create(article=article, content=article.content, content_hash=article_hash, **fields)
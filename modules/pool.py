@@ -0,0 +1,41 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def _get_executor(name, max_workers):
+    with _lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        return _executors[name]
+
+
+def _run_in_thread(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Pool threads get their own database connections, don't leak them
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Run func on the shared pool used for concurrent model calls."""
+    return _get_executor('scoring', settings.SCORING_CALL_THREADS).submit(_run_in_thread, func, *args, **kwargs)
+
+
+def map_chunks(func, arguments):
+    """Call func once per argument tuple concurrently and return the results in order.
+
+    Chunks of one document run on their own pool, so a task already running on the
+    scoring pool can fan out without waiting on its own pool's threads.
+    """
+    if len(arguments) == 1:
+        return [func(*arguments[0])]
+    executor = _get_executor('chunks', settings.SCORING_CHUNK_PARALLELISM)
+    futures = [executor.submit(_run_in_thread, func, *args) for args in arguments]
+    return [future.result() for future in futures]
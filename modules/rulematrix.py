@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db.models import Q
+
+from rules.prompts import get_rules_prompt
+
+from .cache import content_hash
+from .exemplars import note_article_score
+from .models import Article, Module
+from .paragraphs import aggregate, evaluate_missing, evaluate_paragraphs, load_evaluations, save_rule_scores
+from .normalize import normalize_article
+from .search import index_articles
+from .text import prompt_paragraphs
+
+
+def stale_articles(queryset=None):
+    """Articles whose score was computed against another version of their module's rules."""
+    queryset = Article.objects.all() if queryset is None else queryset
+    stale = Q(pk__in=[])
+    lead_writers = Module.objects.filter(
+        pk__in=queryset.values('module_id')
+    ).values_list('lead_writer_id', flat=True).distinct()
+    for lead_writer_id in lead_writers:
+        version = get_rules_prompt(lead_writer_id).version
+        stale |= Q(module__lead_writer_id=lead_writer_id) & ~Q(rules_version=version)
+    return queryset.filter(stale)
+
+
+def _refresh_batch(articles):
+    # Collect the (paragraph, rule) pairs the whole batch is missing, so a changed rule
+    # is evaluated as one column across many articles instead of article by article
+    plans = []
+    for article in articles:
+        rules = get_rules_prompt(article.module.lead_writer_id)
+        paragraphs = prompt_paragraphs(normalize_article(article))
+        plans.append((article, rules, paragraphs, [content_hash(p) for p in paragraphs]))
+
+    known = load_evaluations(
+        [h for _, _, _, hashes in plans for h in hashes],
+        [rule.hash for _, rules, _, _ in plans for rule in rules.rules],
+    )
+    missing_by_version = {}
+    for article, rules, paragraphs, hashes in plans:
+        missing = missing_by_version.setdefault(rules.version, (rules, {}))[1]
+        for paragraph_hash, paragraph in zip(hashes, paragraphs):
+            for rule in rules.rules:
+                if (paragraph_hash, rule.hash) not in known:
+                    missing[(paragraph_hash, rule.hash)] = paragraph
+    for rules, missing in missing_by_version.values():
+        if missing:
+            evaluate_missing(missing, rules.rules)
+
+    refreshed = []
+    for article, rules, paragraphs, _ in plans:
+        if not paragraphs:
+            continue
+        # Every pair is stored now, so this is a pure recomputation
+        results = evaluate_paragraphs(article.plain_content, rules)
+        article.score, article.feedback, rule_scores = aggregate(results, rules)
+        article.rules_version = rules.version
+        save_rule_scores(article, rule_scores)
+        refreshed.append(article)
+    Article.objects.bulk_update(refreshed, ['score', 'feedback', 'rules_version'])
+    # bulk_update sends no post_save, the new feedback is indexed here
+    index_articles(refreshed)
+    for article in refreshed:
+        note_article_score(article)
+    return len(refreshed)
+
+
+def refresh_rule_scores(queryset=None, keep_going=None):
+    """Bring scored articles up to date after a rule was added, edited, reweighted or turned off.
+
+    keep_going is called between batches, the refresh stops when it returns False.
+    """
+    articles = stale_articles(queryset).filter(status=Article.STATUS_DONE).select_related('module')
+    batch_size = settings.SCORING_RULE_REFRESH_BATCH
+    refreshed = 0
+    last_pk = 0
+    while True:
+        batch = list(articles.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            return refreshed
+        refreshed += _refresh_batch(batch)
+        last_pk = batch[-1].pk
+        if keep_going and not keep_going():
+            return refreshed
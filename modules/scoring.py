@@ -0,0 +1,271 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from rules.prompts import get_rules_prompt
+
+from . import pool, stylometry
+from .ai import aai_sync_article, ai_sync_article, astream_sync_article
+from .duplicates import check_duplicate
+from .exceptions import ScoringError
+from .exemplars import get_exemplar, nearest_exemplars, note_article_score
+from .models import Article
+from .normalize import normalize_article
+from .paragraphs import aevaluate_paragraphs, aggregate, evaluate_paragraphs, record_revision, save_rule_scores
+
+NO_SYNC_NEEDED = "Great job! The article is well-written and perfectly aligned. No sync needed."
+NO_OTHER_ARTICLE = "No Other Article, Re-Save Later"
+NEAR_DUPLICATE = 'This article is a near copy of "{}" ({:.0%} the same). Rewrite it in your own words to get it scored.'
+
+SYNC_FIELDS = ['sync_level', 'sync_suggestion', 'synced_revision', 'style_vector']
+SCORE_FIELDS = ['score', 'feedback', 'status', 'rules_version'] + SYNC_FIELDS
+
+def _style_vector(article):
+    vector = stylometry.unpack(article.style_vector)
+    if vector is None:
+        vector = stylometry.extract_features(article.content)
+        article.style_vector = stylometry.pack(vector)
+        Article.objects.filter(pk=article.pk).update(style_vector=article.style_vector)
+    return vector
+
+
+def _local_sync(exemplars, article):
+    vector = stylometry.unpack(article.style_vector)
+    styles = [_style_vector(exemplar) for exemplar, _ in exemplars]
+    # Closer exemplars count for more, the tips follow the nearest one
+    weights = [max(similarity, 0.05) for _, similarity in exemplars]
+    levels = [int(stylometry.sync_level(style, vector)[0]) for style in styles]
+    level = round(sum(level * weight for level, weight in zip(levels, weights)) / sum(weights))
+    low, high = settings.STYLE_SYNC_UNCERTAIN_BAND
+    if low <= level <= high:
+        return None
+    return level, stylometry.suggestion(styles[0], vector)
+
+
+def _exemplars(article, best_article, above=None):
+    # The nearest of the module's best scored articles, so the article is compared with
+    # exemplars on a similar topic and in a similar format rather than only the top one
+    return nearest_exemplars(article, above=above) or [(best_article, 1.0)]
+
+
+def _style_sync(exemplars, article):
+    if exemplars and settings.STYLE_SYNC_ENABLED:
+        return _local_sync(exemplars, article)
+    return None
+
+
+def _rescope(article, best_article, exemplars, local_sync, best_text):
+    """Re-pick the exemplars among the articles scored above this one, once its score is known.
+
+    The exemplars were picked before it was scored. Returns (local_sync, best_text, whether
+    a sync already started against the old nearest exemplar still holds).
+    """
+    if (not exemplars or article.score >= best_article.score
+            or all(exemplar.score > article.score for exemplar, _ in exemplars)):
+        return local_sync, best_text, True
+    nearest = exemplars[0][0].pk
+    exemplars = _exemplars(article, best_article, above=article.score)
+    return _style_sync(exemplars, article), _exemplar_text(exemplars), exemplars[0][0].pk == nearest
+
+
+def _exemplar_text(exemplars):
+    # The model only reads the nearest one, the others weigh in through the local style comparison
+    return normalize_article(exemplars[0][0])
+
+
+def _needs_model_sync(article, best_article, local_sync):
+    return best_article is not None and article.score < best_article.score and not local_sync
+
+
+def _apply_sync(article, best_article, local_sync=None, model_sync=None):
+    """Fill in the sync fields, model_sync() is only called when the model has to be asked."""
+    if best_article and article.score >= best_article.score:
+        article.sync_level = article.score
+        article.sync_suggestion = NO_SYNC_NEEDED
+    elif local_sync:
+        article.sync_level, article.sync_suggestion = local_sync
+    elif best_article:
+        sync_level, sync_suggestion = model_sync()
+        if sync_level is None:
+            raise ScoringError("The model did not return a sync level")
+        article.sync_level = sync_level
+        article.sync_suggestion = sync_suggestion
+    else:
+        article.sync_level = article.score
+        article.sync_suggestion = NO_OTHER_ARTICLE
+
+
+def _prepare(article):
+    best_article, revision = get_exemplar(article.module_id, exclude_pk=article.pk)
+
+    article.style_vector = stylometry.pack(stylometry.extract_features(article.content))
+    exemplars = _exemplars(article, best_article) if best_article else []
+
+    # The local style comparison settles most syncs without the model,
+    # only scores in the uncertain band are double checked by it
+    local_sync = _style_sync(exemplars, article)
+
+    rules = get_rules_prompt(article.module.lead_writer_id)
+    best_text = _exemplar_text(exemplars) if exemplars else None
+    return best_article, revision, exemplars, local_sync, rules, normalize_article(article), best_text
+
+
+def _finish(article, paragraphs, rules, revision, commit):
+    article.synced_revision = revision
+    article.status = Article.STATUS_DONE
+    if commit:
+        # Only touch the scoring columns so a concurrent edit of the content is never overwritten
+        article.save(update_fields=SCORE_FIELDS)
+        save_rule_scores(article, article.rule_results)
+        record_revision(article, paragraphs, rules)
+        note_article_score(article)
+
+
+def skip_duplicate(article, commit=True):
+    """Flag a near copy of an earlier article instead of scoring it, returns whether it was one."""
+    if not check_duplicate(article):
+        return False
+    original = Article.objects.filter(pk=article.duplicate_of_id).values_list('title', flat=True).first()
+    article.score = None
+    article.feedback = NEAR_DUPLICATE.format(original, article.duplicate_similarity)
+    article.sync_level = None
+    article.sync_suggestion = None
+    article.status = Article.STATUS_DUPLICATE
+    article.rule_results = {}
+    if commit:
+        article.save(update_fields=SCORE_FIELDS)
+        save_rule_scores(article, article.rule_results)
+        # A copy can't stay the module's best article
+        note_article_score(article)
+    return True
+
+
+def score_article(article, commit=True, use_cache=True):
+    if skip_duplicate(article, commit):
+        return article
+    best_article, revision, exemplars, local_sync, rules, text, best_text = _prepare(article)
+
+    # Start the sync call speculatively so both model round trips overlap,
+    # its result is thrown away if the new score makes this article the best
+    sync_future = None
+    if best_article and not local_sync and settings.SCORING_SPECULATIVE_SYNC:
+        sync_future = pool.submit(ai_sync_article, best_text, text, use_cache=use_cache)
+
+    try:
+        # Only paragraphs without a stored evaluation for these rules go to the model
+        paragraphs = evaluate_paragraphs(text, rules, use_cache=use_cache)
+    except Exception:
+        if sync_future:
+            sync_future.cancel()
+        raise
+    article.score, article.feedback, article.rule_results = aggregate(paragraphs, rules)
+    article.rules_version = rules.version
+
+    local_sync, best_text, still_holds = _rescope(article, best_article, exemplars, local_sync, best_text)
+    if sync_future and not (still_holds and _needs_model_sync(article, best_article, local_sync)):
+        sync_future.cancel()
+        sync_future = None
+    _apply_sync(
+        article, best_article, local_sync,
+        sync_future.result if sync_future else lambda: ai_sync_article(best_text, text, use_cache=use_cache),
+    )
+    _finish(article, paragraphs, rules, revision, commit)
+    return article
+
+
+async def ascore_article(article, commit=True, use_cache=True):
+    """score_article for async views, no thread is held while the model calls are waited on."""
+    if await sync_to_async(skip_duplicate)(article, commit):
+        return article
+    best_article, revision, exemplars, local_sync, rules, text, best_text = await sync_to_async(_prepare)(article)
+
+    sync_task = None
+    if best_article and not local_sync and settings.SCORING_SPECULATIVE_SYNC:
+        sync_task = asyncio.ensure_future(aai_sync_article(best_text, text, use_cache=use_cache))
+
+    try:
+        paragraphs = await aevaluate_paragraphs(text, rules, use_cache=use_cache)
+    except Exception:
+        if sync_task:
+            sync_task.cancel()
+        raise
+    article.score, article.feedback, article.rule_results = aggregate(paragraphs, rules)
+    article.rules_version = rules.version
+
+    local_sync, best_text, still_holds = await sync_to_async(_rescope)(
+        article, best_article, exemplars, local_sync, best_text
+    )
+    if sync_task and not (still_holds and _needs_model_sync(article, best_article, local_sync)):
+        sync_task.cancel()
+        sync_task = None
+    model_sync = None
+    if _needs_model_sync(article, best_article, local_sync):
+        model_sync = await (sync_task or aai_sync_article(best_text, text, use_cache=use_cache))
+    _apply_sync(article, best_article, local_sync, lambda: model_sync)
+    await sync_to_async(_finish)(article, paragraphs, rules, revision, commit)
+    return article
+
+
+async def astream_score_article(article, use_cache=True):
+    """Score the article and yield (event, data) pairs as the results come in.
+
+    The score comes first, then the sync level and the suggestion tokens as the model
+    writes them, and a final 'done' once everything is saved.
+    """
+    if await sync_to_async(skip_duplicate)(article):
+        yield 'done', {'score': None, 'feedback': article.feedback, 'sync_level': None, 'sync_suggestion': None}
+        return
+    best_article, revision, exemplars, local_sync, rules, text, best_text = await sync_to_async(_prepare)(article)
+    paragraphs = await aevaluate_paragraphs(text, rules, use_cache=use_cache)
+    article.score, article.feedback, article.rule_results = aggregate(paragraphs, rules)
+    article.rules_version = rules.version
+    yield 'score', {'score': article.score, 'feedback': article.feedback}
+
+    local_sync, best_text, _ = await sync_to_async(_rescope)(article, best_article, exemplars, local_sync, best_text)
+    model_sync = None
+    if _needs_model_sync(article, best_article, local_sync):
+        level, tokens = None, []
+        async for kind, value in astream_sync_article(best_text, text, use_cache=use_cache):
+            if kind == 'level':
+                level = value
+                yield 'sync_level', {'sync_level': value}
+            else:
+                tokens.append(value)
+                yield 'token', value
+        model_sync = (level, "".join(tokens))
+    _apply_sync(article, best_article, local_sync, lambda: model_sync)
+    if model_sync is None:
+        yield 'sync_level', {'sync_level': article.sync_level}
+        yield 'token', article.sync_suggestion
+
+    await sync_to_async(_finish)(article, paragraphs, rules, revision, True)
+    yield 'done', {
+        'score': article.score,
+        'feedback': article.feedback,
+        'sync_level': article.sync_level,
+        'sync_suggestion': article.sync_suggestion,
+    }
+
+
+def sync_article(article, commit=True, use_cache=True):
+    """Redo only the sync of an already scored article against the current exemplar."""
+    if article.score is None:
+        raise ScoringError("The article has not been scored yet")
+    best_article, revision = get_exemplar(article.module_id, exclude_pk=article.pk)
+
+    if stylometry.unpack(article.style_vector) is None:
+        article.style_vector = stylometry.pack(stylometry.extract_features(article.content))
+    exemplars = []
+    if best_article and article.score < best_article.score:
+        exemplars = _exemplars(article, best_article, above=article.score)
+    local_sync = _style_sync(exemplars, article)
+
+    _apply_sync(
+        article, best_article, local_sync,
+        lambda: ai_sync_article(_exemplar_text(exemplars), normalize_article(article), use_cache=use_cache),
+    )
+    article.synced_revision = revision
+    if commit:
+        article.save(update_fields=SYNC_FIELDS)
+    return article
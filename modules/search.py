@@ -0,0 +1,94 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .text import split_paragraphs
+
+# One row per article, created by migration 0014. SQLite keeps it in an FTS5 table
+# keyed by the article id, PostgreSQL in a weighted tsvector with a GIN index.
+SEARCH_TABLE = 'modules_article_search'
+SEARCH_CONFIG = 'english'
+INDEXED_FIELDS = ('title', 'content', 'feedback')
+TERM_RE = re.compile(r'\w+')
+
+SQLITE_MATCH = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+SQLITE_RANK = f"SELECT rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid = modules_article.id"
+POSTGRES_MATCH = (
+    f"SELECT article_id FROM {SEARCH_TABLE} WHERE document @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+)
+# Negated so that, as with the FTS5 rank, lower sorts first
+POSTGRES_RANK = (
+    f"SELECT -ts_rank(document, websearch_to_tsquery('{SEARCH_CONFIG}', %s)) "
+    f"FROM {SEARCH_TABLE} WHERE article_id = modules_article.id"
+)
+POSTGRES_DOCUMENT = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'C')"
+)
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def document(article):
+    """Return the (title, plain text, feedback) indexed for an article."""
+    return article.title or '', "\n".join(split_paragraphs(article.content)), article.feedback or ''
+
+
+def index_articles(articles):
+    """Add or replace the search rows of saved articles."""
+    rows = [(article.pk, *document(article)) for article in articles if article.pk]
+    if not rows or not is_supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # FTS5 has no upsert, the old row goes first
+            cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, content, feedback) VALUES (%s, %s, %s, %s)", rows
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (article_id, document) VALUES (%s, {POSTGRES_DOCUMENT}) "
+                "ON CONFLICT (article_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def unindex_articles(pks):
+    pks = [(pk,) for pk in pks if pk]
+    if not pks or not is_supported():
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'article_id'
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE {column} = %s", pks)
+
+
+def _sqlite_query(terms):
+    # Every word quoted so user input is never read as FTS5 syntax, the last one as a prefix
+    quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+    quoted[-1] += '*'
+    return " ".join(quoted)
+
+
+def search_articles(queryset, search_term, also=None):
+    """Filter an article queryset to full text matches, annotated with search_rank (best first).
+
+    also is a Q of further matches, whose search_rank is null unless the text matched too.
+    Returns None when the database has no full text index, or the term has no words.
+    """
+    terms = TERM_RE.findall(search_term)
+    if not terms or not is_supported():
+        return None
+    if connection.vendor == 'sqlite':
+        query, match, rank = _sqlite_query(terms), SQLITE_MATCH, SQLITE_RANK
+    else:
+        query, match, rank = " ".join(terms), POSTGRES_MATCH, POSTGRES_RANK
+    matches = Q(pk__in=RawSQL(match, (query,)))
+    if also is not None:
+        matches |= also
+    return queryset.filter(matches).annotate(search_rank=RawSQL(rank, (query,)))
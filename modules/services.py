@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .exceptions import ScoringError
+from .jobs import enqueue_scoring
+from .models import Article
+from .scoring import ascore_article, score_article, skip_duplicate
+from .search import index_articles
+from .vectorindex import index_article, update_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def submit_article(article, score_now=False):
+    """Save a new or edited article and get it scored, the one entry point for every caller.
+
+    With score_now the article is scored before returning and None is returned, otherwise
+    (or when scoring fails for any reason) it is queued for score_worker and the job is returned.
+    Near copies of an older article are flagged right away and never queued.
+    """
+    article.status = Article.STATUS_PENDING
+    article.save()
+    index_article(article)
+    if skip_duplicate(article):
+        return None
+    if score_now:
+        try:
+            score_article(article)
+            return None
+        except ScoringError:
+            pass
+        except Exception:
+            # Whatever went wrong, the worker gets another go rather than leaving it pending
+            logger.exception("Scoring article #%s inline failed, queueing it", article.pk)
+    return enqueue_scoring(article)
+
+
+async def asubmit_article(article, score_now=False, stream=False):
+    """submit_article for async views.
+
+    With stream the caller scores the article while streaming the feedback, the job is only
+    a fallback held back by SCORING_JOB_VISIBILITY_TIMEOUT in case the stream never finishes.
+    """
+    article.status = Article.STATUS_PENDING
+    await article.asave()
+    await sync_to_async(index_article)(article)
+    if await sync_to_async(skip_duplicate)(article):
+        return None
+    if stream:
+        return await sync_to_async(enqueue_scoring)(article, delay=settings.SCORING_JOB_VISIBILITY_TIMEOUT)
+    if score_now:
+        try:
+            await ascore_article(article)
+            return None
+        except ScoringError:
+            pass
+        except Exception:
+            logger.exception("Scoring article #%s inline failed, queueing it", article.pk)
+    return await sync_to_async(enqueue_scoring)(article)
+
+
+def _save_batch(articles):
+    for article in articles:
+        article.status = Article.STATUS_PENDING
+    # One insert for the whole batch, bulk_create sends no post_save so the search rows are added here
+    Article.objects.bulk_create(articles)
+    index_articles(articles)
+    update_embeddings(articles)
+    for article in articles:
+        index_article(article)
+    return [article for article in articles if not skip_duplicate(article)]
+
+
+def _enqueue_batch(articles):
+    return {article.pk: enqueue_scoring(article) for article in articles}
+
+
+async def _score_batch(articles, timeout):
+    limit = asyncio.Semaphore(settings.SCORING_API_CONCURRENCY)
+
+    async def score(article):
+        async with limit:
+            await ascore_article(article)
+
+    tasks = {asyncio.ensure_future(score(article)): article for article in articles}
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    unscored = []
+    for task, article in tasks.items():
+        if task in pending:
+            unscored.append(article)
+        elif task.exception():
+            if not isinstance(task.exception(), ScoringError):
+                logger.error("Scoring article #%s inline failed, queueing it", article.pk, exc_info=task.exception())
+            unscored.append(article)
+    return unscored
+
+
+async def asubmit_articles(articles, score_now=False, timeout=None):
+    """asubmit_article for a batch of new articles, saved with one insert.
+
+    With score_now they are scored concurrently for up to timeout seconds. Returns
+    {article id: job} for the articles left to score_worker.
+    """
+    articles = await sync_to_async(_save_batch)(articles)
+    if score_now:
+        articles = await _score_batch(articles, timeout)
+    return await sync_to_async(_enqueue_batch)(articles)
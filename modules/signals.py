@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rules.models import WritingRule
+
+from .exemplars import recompute_best_article
+from .jobs import enqueue_rule_refresh
+from .models import Article, Module
+from .search import INDEXED_FIELDS, index_articles, unindex_articles
+from .vectorindex import forget_article
+
+
+@receiver(post_delete, sender=Article)
+def replace_deleted_best_article(sender, instance, **kwargs):
+    # SET_NULL already cleared the pointer, the stale best_score shows it was this article
+    if Module.objects.filter(pk=instance.module_id, best_article__isnull=True, best_score__isnull=False).exists():
+        recompute_best_article(instance.module_id)
+
+
+@receiver(post_save, sender=Article)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    # Score and sync saves leave the indexed text alone
+    if update_fields is None or set(update_fields) & set(INDEXED_FIELDS):
+        index_articles([instance])
+
+
+@receiver(post_delete, sender=Article)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_articles([instance.pk])
+    forget_article(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=WritingRule)
+def refresh_rule_scores_later(sender, **kwargs):
+    # Only the changed rule's column gets evaluated, the rest comes from stored evaluations
+    transaction.on_commit(enqueue_rule_refresh)
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import InFlightCall
+
+
+def _owner_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def _claim(key, owner):
+    expires_at = timezone.now() + timedelta(seconds=settings.SINGLE_FLIGHT_LEASE)
+    try:
+        InFlightCall.objects.create(key=key, owner=owner, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        pass
+    # Take over the call of an owner that died without releasing it
+    return bool(InFlightCall.objects.filter(key=key, expires_at__lt=timezone.now()).update(
+        owner=owner, expires_at=expires_at,
+    ))
+
+
+def single_flight(key, compute, lookup):
+    """Run compute() once for concurrent callers with the same key, in any process.
+
+    Callers arriving while another one computes poll lookup() for the stored result
+    instead, for at most SINGLE_FLIGHT_WAIT seconds before computing it themselves.
+    Returns (result, shared), shared being True when the result came from another caller.
+    """
+    owner = _owner_id()
+    give_up_at = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while True:
+        if _claim(key, owner):
+            try:
+                return compute(), False
+            finally:
+                InFlightCall.objects.filter(key=key, owner=owner).delete()
+
+        while time.monotonic() < give_up_at:
+            time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+            result = lookup()
+            if result is not None:
+                return result, True
+            if not InFlightCall.objects.filter(key=key).exists():
+                # The owner failed without a result, the next claim decides who retries
+                break
+        else:
+            return compute(), False
+
+
+async def asingle_flight(key, compute, lookup):
+    """single_flight for a coroutine function compute and a blocking lookup, waiting with asyncio.sleep."""
+    owner = _owner_id()
+    give_up_at = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while True:
+        if await sync_to_async(_claim)(key, owner):
+            try:
+                return await compute(), False
+            finally:
+                await InFlightCall.objects.filter(key=key, owner=owner).adelete()
+
+        while time.monotonic() < give_up_at:
+            await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+            result = await sync_to_async(lookup)()
+            if result is not None:
+                return result, True
+            if not await InFlightCall.objects.filter(key=key).aexists():
+                break
+        else:
+            return await compute(), False
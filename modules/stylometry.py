@@ -0,0 +1,145 @@
+import re
+
+import numpy as np
+
+from .text import plain_text, split_paragraphs
+
+FUNCTION_WORDS = (
+    'the', 'a', 'an', 'and', 'but', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'at', 'by', 'from',
+    'as', 'that', 'this', 'it', 'is', 'are', 'was', 'be', 'not', 'you', 'your', 'we', 'i', 'they',
+    'he', 'she', 'can', 'will', 'so', 'if', 'because',
+)
+PUNCTUATION = (',', ';', ':', '!', '?', '-', '(', '"')
+SENTENCE_BINS = (8, 15, 25)
+
+# (name, typical spread) for every scalar feature, in vector order. The spread is
+# the difference that counts as "completely different" when comparing two articles.
+SCALAR_FEATURES = (
+    ('sentence_length', 12.0),
+    ('sentence_length_spread', 8.0),
+    ('paragraph_length', 4.0),
+    ('paragraph_length_spread', 3.0),
+    ('word_length', 1.5),
+    ('lexical_diversity', 0.25),
+    ('hapax_ratio', 0.3),
+    ('reading_ease', 40.0),
+    ('question_ratio', 0.3),
+)
+FEATURE_NAMES = (
+    [name for name, _ in SCALAR_FEATURES]
+    + [f'sentences_up_to_{limit}_words' for limit in SENTENCE_BINS] + ['sentences_over_25_words']
+    + [f'punctuation_{mark}' for mark in PUNCTUATION]
+    + [f'word_{word}' for word in FUNCTION_WORDS]
+)
+FEATURE_SCALES = np.array(
+    [spread for _, spread in SCALAR_FEATURES]
+    + [0.3] * (len(SENTENCE_BINS) + 1)
+    + [3.0] * len(PUNCTUATION)
+    + [0.02] * len(FUNCTION_WORDS),
+    dtype=np.float32,
+)
+FEATURE_COUNT = len(FEATURE_NAMES)
+
+WORD_RE = re.compile(r"[A-Za-z']+")
+SENTENCE_RE = re.compile(r'[^.!?]+[.!?]*')
+VOWEL_GROUP_RE = re.compile(r'[aeiouy]+')
+
+# Human readable hints for the features worth talking about, keyed by index
+HINTS = {
+    FEATURE_NAMES.index('sentence_length'): ('Use shorter sentences', 'Use longer sentences', '{:.0f} words per sentence'),
+    FEATURE_NAMES.index('paragraph_length'): ('Use shorter paragraphs', 'Use longer paragraphs', '{:.1f} sentences per paragraph'),
+    FEATURE_NAMES.index('word_length'): ('Use simpler, shorter words', 'Use richer, longer words', '{:.1f} letters per word'),
+    FEATURE_NAMES.index('lexical_diversity'): ('Repeat key words more', 'Vary your vocabulary more', '{:.2f} word variety'),
+    FEATURE_NAMES.index('reading_ease'): ('Make the text a bit more formal', 'Make the text easier to read', '{:.0f} reading ease'),
+    FEATURE_NAMES.index('question_ratio'): ('Ask fewer questions', 'Ask the reader more questions', '{:.0%} questions'),
+    FEATURE_NAMES.index('punctuation_,'): ('Use fewer commas', 'Use more commas', '{:.1f} commas per 100 words'),
+    FEATURE_NAMES.index('punctuation_!'): ('Use fewer exclamation marks', 'Use more exclamation marks', '{:.1f} per 100 words'),
+}
+
+
+def _syllables(word):
+    return max(1, len(VOWEL_GROUP_RE.findall(word.lower())))
+
+
+def _moving_type_token_ratio(words, window=100):
+    if len(words) <= window:
+        return len(set(words)) / len(words)
+    ratios = [len(set(words[i:i + window])) / window for i in range(0, len(words) - window + 1, window // 2)]
+    return float(np.mean(ratios))
+
+
+def extract_features(content):
+    """Return the float32 style vector of an article's HTML content."""
+    vector = np.zeros(FEATURE_COUNT, dtype=np.float32)
+
+    paragraphs = split_paragraphs(content)
+    sentences_per_paragraph = []
+    sentences = []
+    for paragraph in paragraphs:
+        found = [s.strip() for s in SENTENCE_RE.findall(paragraph) if WORD_RE.search(s)]
+        sentences_per_paragraph.append(len(found))
+        sentences.extend(found)
+
+    words = [w.lower() for w in WORD_RE.findall(plain_text(content))]
+    if not words or not sentences:
+        return vector
+
+    sentence_lengths = np.array([len(WORD_RE.findall(s)) for s in sentences], dtype=np.float32)
+    paragraph_lengths = np.array(sentences_per_paragraph, dtype=np.float32)
+    word_lengths = np.array([len(w) for w in words], dtype=np.float32)
+    syllables = sum(_syllables(w) for w in words)
+    counts = {}
+    for word in words:
+        counts[word] = counts.get(word, 0) + 1
+    text = plain_text(content)
+
+    scalars = [
+        sentence_lengths.mean(),
+        sentence_lengths.std(),
+        paragraph_lengths.mean(),
+        paragraph_lengths.std(),
+        word_lengths.mean(),
+        _moving_type_token_ratio(words),
+        sum(1 for c in counts.values() if c == 1) / len(counts),
+        206.835 - 1.015 * (len(words) / len(sentences)) - 84.6 * (syllables / len(words)),
+        sum(1 for s in sentences if s.endswith('?')) / len(sentences),
+    ]
+    bins = np.histogram(sentence_lengths, bins=(0,) + tuple(b + 0.5 for b in SENTENCE_BINS) + (np.inf,))[0]
+    punctuation = [text.count(mark) * 100 / len(words) for mark in PUNCTUATION]
+    function_words = [counts.get(word, 0) / len(words) for word in FUNCTION_WORDS]
+
+    vector[:] = scalars + list(bins / len(sentences)) + punctuation + function_words
+    return vector
+
+
+def pack(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def unpack(data):
+    if not data:
+        return None
+    vector = np.frombuffer(bytes(data), dtype=np.float32)
+    # Vectors stored before a feature was added are treated as missing
+    return vector if vector.shape[0] == FEATURE_COUNT else None
+
+
+def sync_level(exemplar, vectors):
+    """Score 1-100 how close each row of vectors is to the exemplar's style."""
+    vectors = np.atleast_2d(vectors)
+    distance = np.minimum(np.abs(vectors - exemplar) / FEATURE_SCALES, 1.0).mean(axis=1)
+    return np.rint(1 + 99 * (1 - distance)).astype(int)
+
+
+def suggestion(exemplar, vector, limit=3):
+    gaps = np.abs(vector - exemplar) / FEATURE_SCALES
+    tips = []
+    for index in sorted(HINTS, key=lambda i: -gaps[i]):
+        if gaps[index] < 0.25 or len(tips) >= limit:
+            break
+        lower, higher, unit = HINTS[index]
+        tip = lower if vector[index] > exemplar[index] else higher
+        tips.append(f"{tip} (aim for {unit.format(exemplar[index])}, currently {unit.format(vector[index])}).")
+    if not tips:
+        return "Great job! Your writing style already matches the module's best article closely."
+    return " ".join(tips)
@@ -1,3 +1,42 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from rules.prompts import CompiledRules, Rule
+
+from .paragraphs import ALL_RULES_FOLLOWED, ParagraphResult, aggregate
+
+
+class AggregateTests(SimpleTestCase):
+    def rules(self, *weights):
+        return CompiledRules('', 'v1', [Rule(i, f"Rule {i}", weight, f"h{i}") for i, weight in enumerate(weights, 1)])
+
+    def results(self, *scores):
+        # One paragraph per entry, each a {rule hash: score} dict
+        return [
+            ParagraphResult(index, "word " * 10, f"p{index}", {r: (s, f"fix {r}") for r, s in paragraph.items()})
+            for index, paragraph in enumerate(scores, 1)
+        ]
+
+    def test_weighted_mean_of_rule_scores(self):
+        score, _, rule_scores = aggregate(self.results({'h1': 90, 'h2': 60}), self.rules(2, 1))
+        self.assertEqual(score, 80)
+        self.assertEqual([s for s, _ in rule_scores.values()], [90, 60])
+
+    def test_zero_weight_rules_do_not_count(self):
+        score, _, _ = aggregate(self.results({'h1': 90, 'h2': 30}), self.rules(2, 0))
+        self.assertEqual(score, 90)
+
+    def test_all_zero_weights_count_equally(self):
+        score, _, _ = aggregate(self.results({'h1': 90, 'h2': 30}), self.rules(0, 0))
+        self.assertEqual(score, 60)
+
+    def test_paragraphs_weighted_by_length(self):
+        results = self.results({'h1': 100}, {'h1': 40})
+        results[1] = results[1]._replace(text="word " * 30)
+        score, feedback, _ = aggregate(results, self.rules(1))
+        self.assertEqual(score, 55)
+        self.assertIn("Paragraph 2: fix h1", feedback)
+
+    def test_perfect_scores(self):
+        score, feedback, _ = aggregate(self.results({'h1': 100, 'h2': 100}), self.rules(1, 3))
+        self.assertEqual(score, 100)
+        self.assertEqual(feedback, ALL_RULES_FOLLOWED)
@@ -0,0 +1,95 @@
+import html
+import re
+
+from django.conf import settings
+from django.utils.html import strip_tags
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+BLOCK_BREAK_RE = re.compile(
+    r'</(?:p|div|h[1-6]|li|blockquote|pre|tr)>|<br\s*/?>\s*<br\s*/?>|\n\s*\n',
+    re.IGNORECASE,
+)
+
+# Rewrites applied in order to turn CKEditor HTML into light markdown before the tags are stripped
+MARKDOWN_RULES = [
+    (re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL), ''),
+    (re.compile(r'<!--.*?-->', re.DOTALL), ''),
+    (re.compile(r'\s*\n\s*'), ' '),
+    (re.compile(r'<h([1-6])\b[^>]*>', re.IGNORECASE), lambda m: '\n\n' + '#' * int(m.group(1)) + ' '),
+    (re.compile(r'<li\b[^>]*>', re.IGNORECASE), '\n- '),
+    (re.compile(r'</?(?:ul|ol)\b[^>]*>', re.IGNORECASE), '\n\n'),
+    (re.compile(r'<br\s*/?>', re.IGNORECASE), '\n'),
+    (re.compile(r'</(?:p|div|h[1-6]|blockquote|pre|tr|table)>', re.IGNORECASE), '\n\n'),
+]
+PROMPT_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+_encoding = None
+
+
+def plain_text(content):
+    return html.unescape(strip_tags(content or ''))
+
+
+def split_paragraphs(content):
+    """Split rich text content into the plain text of its paragraphs, in order."""
+    paragraphs = (" ".join(plain_text(block).split()) for block in BLOCK_BREAK_RE.split(content or ''))
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+
+def prompt_text(content):
+    """Convert rich text content to the compact light markdown sent to the model."""
+    content = content or ''
+    if '<' not in content:
+        # Plain text content, only the paragraph breaks carry meaning
+        content = PROMPT_PARAGRAPH_RE.sub('</p>', content)
+    for pattern, replacement in MARKDOWN_RULES:
+        content = pattern.sub(replacement, content)
+    blocks = []
+    for block in PROMPT_PARAGRAPH_RE.split(plain_text(content)):
+        lines = [" ".join(line.split()) for line in block.split('\n')]
+        block = "\n".join(line for line in lines if line)
+        if block:
+            blocks.append(block)
+    return "\n\n".join(blocks)
+
+
+def prompt_paragraphs(text):
+    """The paragraphs of prompt_text's output, lists stay together as one paragraph."""
+    return [paragraph for paragraph in PROMPT_PARAGRAPH_RE.split(text or '') if paragraph.strip()]
+
+
+def count_tokens(text):
+    """Token count of text for gpt-4o, estimated at 4 characters a token without tiktoken."""
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is None:
+        return max(1, round(len(text) / 4))
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding('o200k_base')
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def chunk_paragraphs(paragraphs, max_tokens=None, max_count=None, key=None):
+    """Group consecutive paragraphs into chunks of at most max_tokens tokens and max_count paragraphs.
+
+    A paragraph longer than max_tokens on its own becomes a chunk by itself.
+    """
+    max_tokens = max_tokens or settings.SCORING_CHUNK_TOKENS
+    max_count = max_count or settings.SCORING_PARAGRAPH_BATCH
+    chunks = []
+    chunk, size = [], 0
+    for paragraph in paragraphs:
+        tokens = count_tokens(key(paragraph) if key else paragraph)
+        if chunk and (size + tokens > max_tokens or len(chunk) >= max_count):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(paragraph)
+        size += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
@@ -1,7 +1,10 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('submit/', views.submit_article, name='submit_article'),
     path('submit/success/', views.submit_article_success, name='submit_article_success'),
+    path('<int:pk>/feedback/', views.article_feedback, name='article_feedback'),
+    path('api/batch/', api.score_batch, name='api_score_batch'),
+    path('api/<int:pk>/', api.article_status, name='api_article_status'),
 ]
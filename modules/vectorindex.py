@@ -0,0 +1,266 @@
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import content_hash
+from .embeddings import get_embedder, pack, unpack
+from .models import Article
+
+LOAD_CHUNK = 2000
+IVF_ITERATIONS = 8
+IVF_SAMPLE = 20000
+# Rows written by another process just before a refresh may carry a slightly older timestamp
+REFRESH_MARGIN = timedelta(seconds=5)
+EMBEDDING_FIELDS = ('content', 'embedding', 'embedding_content_hash', 'embedded_at')
+
+
+def _vectors(rows):
+    for pk, data in rows:
+        vector = unpack(data)
+        if vector is not None:
+            yield pk, vector
+
+
+class InvertedFile:
+    """Coarse k-means quantizer over unit vectors, a query only scans the lists of its nearest centroids."""
+
+    def __init__(self, vectors, seed=0):
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), IVF_SAMPLE), replace=False)]
+        count = max(2, int(np.sqrt(len(vectors))))
+        centroids = sample[rng.choice(len(sample), count, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            filled = np.bincount(nearest, minlength=count) > 0
+            # Empty lists keep their old centroid
+            centroids[filled] = sums[filled] / np.linalg.norm(sums[filled], axis=1, keepdims=True)
+        self.centroids = centroids
+        self.trained_size = len(vectors)
+
+    def assign(self, vectors):
+        return np.argmax(np.atleast_2d(vectors) @ self.centroids.T, axis=1)
+
+    def probe(self, vector, probes):
+        probes = min(probes, len(self.centroids))
+        return np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+
+
+class ModuleIndex:
+    """The embeddings of one module's articles, in growable arrays searched with one matrix product.
+
+    Modules over VECTOR_INDEX_ANN_THRESHOLD articles add an InvertedFile, retrained whenever
+    the module has doubled since.
+    """
+
+    def __init__(self, module_id):
+        self.module_id = module_id
+        self.lock = threading.RLock()
+        self.size = 0
+        self.rows = {}
+        self.pks = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, get_embedder().dimensions), dtype=np.float32)
+        self.lists = np.zeros(0, dtype=np.int64)
+        self.ivf = None
+        self.refreshed_at = None
+        self.checked = 0
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        capacity = max(64, 2 * len(self.pks))
+        pks = np.zeros(capacity, dtype=np.int64)
+        vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+        lists = np.zeros(capacity, dtype=np.int64)
+        pks[:self.size], vectors[:self.size], lists[:self.size] = (
+            self.pks[:self.size], self.vectors[:self.size], self.lists[:self.size]
+        )
+        self.pks, self.vectors, self.lists = pks, vectors, lists
+
+    def _put(self, pk, vector):
+        row = self.rows.get(pk)
+        if row is None:
+            if self.size == len(self.pks):
+                self._grow()
+            row = self.rows[pk] = self.size
+            self.pks[row] = pk
+            self.size += 1
+        self.vectors[row] = vector
+        if self.ivf is not None:
+            self.lists[row] = self.ivf.assign(vector)[0]
+
+    def _train(self):
+        if self.size < settings.VECTOR_INDEX_ANN_THRESHOLD:
+            self.ivf = None
+        elif self.ivf is None or self.size > 2 * self.ivf.trained_size:
+            self.ivf = InvertedFile(self.vectors[:self.size])
+            self.lists[:self.size] = self.ivf.assign(self.vectors[:self.size])
+
+    def upsert(self, pk, vector):
+        with self.lock:
+            self._put(pk, vector)
+            self._train()
+
+    def upsert_many(self, items):
+        with self.lock:
+            for pk, vector in items:
+                self._put(pk, vector)
+            self._train()
+
+    def remove(self, pk):
+        with self.lock:
+            row = self.rows.pop(pk, None)
+            if row is None:
+                return
+            # The last row fills the gap
+            last = self.size - 1
+            if row != last:
+                moved = int(self.pks[last])
+                self.pks[row], self.vectors[row], self.lists[row] = self.pks[last], self.vectors[last], self.lists[last]
+                self.rows[moved] = row
+            self.size = last
+
+    def search(self, vector, k, among=None, exclude=()):
+        """Return up to k (article id, cosine similarity) pairs nearest to vector, best first.
+
+        among limits the search to those article ids, which is always exact.
+        """
+        if k < 1:
+            return []
+        with self.lock:
+            if among is not None:
+                rows = np.array([self.rows[pk] for pk in among if pk in self.rows], dtype=np.int64)
+            elif self.ivf is not None:
+                probes = self.ivf.probe(vector, settings.VECTOR_INDEX_PROBES)
+                rows = np.flatnonzero(np.isin(self.lists[:self.size], probes))
+            else:
+                rows = slice(0, self.size)
+            pks = self.pks[rows]
+            similarities = self.vectors[rows] @ vector
+        if exclude:
+            keep = ~np.isin(pks, list(exclude))
+            pks, similarities = pks[keep], similarities[keep]
+        if len(pks) > k:
+            top = np.argpartition(-similarities, k - 1)[:k]
+            pks, similarities = pks[top], similarities[top]
+        order = np.argsort(-similarities, kind='stable')
+        return [(int(pks[i]), float(similarities[i])) for i in order]
+
+    def refresh(self):
+        """Load the module on first use, then pick up embeddings written elsewhere every VECTOR_INDEX_REFRESH seconds."""
+        with self.lock:
+            if self.refreshed_at is not None and time.monotonic() - self.checked < settings.VECTOR_INDEX_REFRESH:
+                return
+            started = timezone.now()
+            if self.refreshed_at is None:
+                self._load()
+            else:
+                since = self.refreshed_at - REFRESH_MARGIN
+                # Saves bump updated_at, embeddings written on their own only embedded_at
+                changed = Article.objects.filter(
+                    Q(embedded_at__gte=since) | Q(updated_at__gte=since), module_id=self.module_id,
+                ).values_list('pk', 'embedding')
+                self.upsert_many(_vectors(changed))
+            self.refreshed_at = started
+            self.checked = time.monotonic()
+
+    def _load(self):
+        # Articles not embedded yet are added once the worker or backfill_embeddings embeds them
+        queryset = Article.objects.filter(module_id=self.module_id, embedding__isnull=False).order_by('pk')
+        last_pk = 0
+        # Paged by primary key, an open cursor on SQLite would block the scoring writes
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk).values_list('pk', 'embedding')[:LOAD_CHUNK])
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            self.upsert_many(_vectors(chunk))
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(module_id):
+    """Return this process's index of the module, loading it on first use."""
+    with _lock:
+        index = _indexes.get(module_id)
+        if index is None:
+            index = _indexes[module_id] = ModuleIndex(module_id)
+    index.refresh()
+    return index
+
+
+def update_embeddings(articles):
+    """Embed the articles whose content changed since their last embedding, returns those."""
+    embedder = get_embedder()
+    changed = []
+    for article in articles:
+        digest = content_hash(article.content)
+        if article.embedding_content_hash == digest and unpack(article.embedding) is not None:
+            continue
+        article.embedding = pack(embedder.embed(article.content))
+        article.embedding_content_hash = digest
+        article.embedded_at = timezone.now()
+        changed.append(article)
+    if changed:
+        Article.objects.bulk_update(changed, ['embedding', 'embedding_content_hash', 'embedded_at'])
+    return changed
+
+
+def stored_vector(article):
+    """Return the article's embedding if it is of its current content, without embedding anything."""
+    if article.embedding_content_hash != content_hash(article.content):
+        return None
+    return unpack(article.embedding)
+
+
+def index_article(article):
+    """Embed a saved article if needed and apply it to the indexes loaded in this process, returns its vector."""
+    update_embeddings([article])
+    vector = unpack(article.embedding)
+    with _lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if index.module_id == article.module_id and vector is not None:
+            index.upsert(article.pk, vector)
+        else:
+            # It may have moved to another module
+            index.remove(article.pk)
+    return vector
+
+
+def forget_article(pk):
+    with _lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.remove(pk)
+
+
+def fetch(index, hits, queryset=None):
+    """Turn search hits into (Article, similarity) pairs, dropping articles deleted or moved meanwhile."""
+    queryset = Article.objects.all() if queryset is None else queryset
+    articles = queryset.filter(module_id=index.module_id).in_bulk([pk for pk, _ in hits])
+    for pk, _ in hits:
+        if pk not in articles:
+            index.remove(pk)
+    return [(articles[pk], similarity) for pk, similarity in hits if pk in articles]
+
+
+def similar_articles(article, k=10):
+    """Return the k articles of article's module closest to it in topic and style, as (Article, similarity) pairs.
+
+    Read only, an article not embedded yet has none.
+    """
+    vector = stored_vector(article)
+    if vector is None:
+        return []
+    index = get_index(article.module_id)
+    return fetch(index, index.search(vector, k, exclude={article.pk}), Article.objects.only('title', 'score', 'module_id'))
@@ -1,20 +1,120 @@
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required
+from . import services
+from .exceptions import ScoringError
 from .forms import ArticleForm
+from .jobs import enqueue_scoring, expedite_job, settle_job
+from .models import Article
+from .scoring import astream_score_article
+
+logger = logging.getLogger(__name__)
+
+def _authenticated_user(request):
+    return request.user if request.user.is_authenticated else None
+
+def _event(name, data):
+    # 'done' is the last event, its id tells a reconnecting EventSource it has everything
+    head = "id: done\n" if name == 'done' else ""
+    return f"{head}event: {name}\ndata: {json.dumps(data)}\n\n"
+
+def _retry():
+    # An EventSource reconnects after a dropped stream, not before the fallback job had its turn
+    return f"retry: {settings.SCORING_JOB_VISIBILITY_TIMEOUT * 1000:.0f}\n\n"
+
+async def _feedback_events(article, job):
+    yield _retry()
+    try:
+        async for name, data in astream_score_article(article):
+            if name == 'done':
+                # The results are saved, the fallback job has nothing left to do
+                await sync_to_async(settle_job)(job)
+            yield _event(name, data)
+    except Exception as e:
+        if not isinstance(e, ScoringError):
+            logger.exception("Streaming the feedback of article #%s failed, queueing it", article.pk)
+        await sync_to_async(expedite_job)(job)
+        yield _event('error', {'error': str(e) if isinstance(e, ScoringError) else "Scoring failed", 'queued': True})
+
+async def _stored_events(article):
+    """The saved results of an article, as the events scoring it would have sent."""
+    yield _retry()
+    if article.status == Article.STATUS_DONE:
+        yield _event('score', {'score': article.score, 'feedback': article.feedback})
+        yield _event('sync_level', {'sync_level': article.sync_level})
+        yield _event('token', article.sync_suggestion or '')
+    yield _event('done', {
+        'score': article.score,
+        'feedback': article.feedback,
+        'sync_level': article.sync_level,
+        'sync_suggestion': article.sync_suggestion,
+    })
+
+def _event_stream(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the events until the end
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+async def _feedback_stream(article, job=None):
+    # Queued up front but held back while the stream scores, so the worker only picks
+    # the article up if the client goes away or the stream dies before saving the results
+    if job is None:
+        job = await sync_to_async(enqueue_scoring)(article, delay=settings.SCORING_JOB_VISIBILITY_TIMEOUT)
+    return _event_stream(_feedback_events(article, job))
+
+async def submit_article(request):
+    # login_required only wraps sync views on Django 4.2
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
 
-@login_required
-def submit_article(request):
     if request.method == 'POST':
         form = ArticleForm(request.POST)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             article = form.save(commit=False)
-            article.writer = request.user  # Set the writer to the currently logged-in user
-            article.save()
+            article.writer = user  # Set the writer to the currently logged-in user
+            if request.POST.get('stream'):
+                # The page reads the feedback from the response as it is written,
+                # a near copy has nothing to score and gets its verdict straight away
+                job = await services.asubmit_article(article, stream=True)
+                if job is None:
+                    return _event_stream(_stored_events(article))
+                return await _feedback_stream(article, job)
+            # Awaiting the model calls holds no worker thread under ASGI, a WSGI worker
+            # would be held for the whole call so the article is queued there instead
+            await services.asubmit_article(article, score_now=isinstance(request, ASGIRequest))
             return redirect('submit_article_success')  # Redirect to a success page or another relevant page
     else:
         form = ArticleForm()
     
-    return render(request, 'modules/article_form.html', {'form': form})
+    return await sync_to_async(render)(request, 'modules/article_form.html', {'form': form})
+
+async def article_feedback(request, pk):
+    """Server-Sent Events stream of the writer's article feedback, for an EventSource on the page.
+
+    A pending article is scored as the events are sent, any other replays its saved results.
+    """
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+    try:
+        article = await Article.objects.select_related('module').aget(pk=pk, writer=user)
+    except Article.DoesNotExist:
+        raise Http404
+    if article.status == Article.STATUS_PENDING:
+        return await _feedback_stream(article)
+    if request.headers.get('Last-Event-ID') == 'done':
+        # The reconnect of an EventSource that already got the results, 204 stops it for good
+        return HttpResponse(status=204)
+    return _event_stream(_stored_events(article))
 
 def submit_article_success(request):
     return render(request, 'modules/submit_article_success.html')
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rules", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="writingrule",
+            name="weight",
+            field=models.PositiveSmallIntegerField(
+                default=1,
+                help_text="How much this rule counts towards the article score",
+            ),
+        ),
+    ]
@@ -7,6 +7,7 @@ class WritingRule(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    weight = models.PositiveSmallIntegerField(default=1, help_text="How much this rule counts towards the article score")
 
     def __str__(self):
         return f"Rule by {self.lead_writer.username} (Created: {self.created_at})"
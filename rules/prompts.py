@@ -0,0 +1,67 @@
+import hashlib
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import WritingRule
+
+Rule = namedtuple('Rule', ['pk', 'text', 'weight', 'hash'])
+CompiledRules = namedtuple('CompiledRules', ['text', 'version', 'rules'])
+
+# Used when no lead writer has written any active rule yet
+DEFAULT_RULE_TEXT = "Write clearly, correctly and engagingly."
+
+GENERATION_KEY = 'rules:generation'
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def invalidate_rules():
+    # A fresh generation orphans every compiled prompt at once, even across workers
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+def rule_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def format_rules(rules):
+    return "\n".join(f"[{rule.hash}] {rule.text}" for rule in rules)
+
+
+def compile_rules(lead_writer_id=None):
+    active_rules = WritingRule.objects.filter(is_active=True).order_by('created_at')
+    rows = []
+    if lead_writer_id:
+        rows = list(active_rules.filter(lead_writer_id=lead_writer_id).values_list('pk', 'rule_text', 'weight'))
+    if not rows:
+        # Lead writers without rules of their own are scored against every active rule
+        rows = list(active_rules.values_list('pk', 'rule_text', 'weight'))
+    rules = tuple(Rule(pk, text, weight, rule_hash(text)) for pk, text, weight in rows)
+    if not rules:
+        rules = (Rule(None, DEFAULT_RULE_TEXT, 1, rule_hash(DEFAULT_RULE_TEXT)),)
+    text = format_rules(rules)
+    version = hashlib.sha256(
+        "\n".join(f"{rule.pk}:{rule.weight}:{rule.hash}" for rule in rules).encode('utf-8')
+    ).hexdigest()[:16]
+    return CompiledRules(text, version, rules)
+
+
+def get_rules_prompt(lead_writer_id=None):
+    key = f"rules:compiled:{_generation()}:{lead_writer_id or 'all'}"
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_rules(lead_writer_id)
+        cache.set(key, (compiled.text, compiled.version, tuple(tuple(rule) for rule in compiled.rules)),
+                  settings.RULES_PROMPT_CACHE_TIMEOUT)
+        return compiled
+    text, version, rules = compiled
+    return CompiledRules(text, version, tuple(Rule(*rule) for rule in rules))
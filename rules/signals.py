@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import WritingRule
+from .prompts import invalidate_rules
+
+
+@receiver([post_save, post_delete], sender=WritingRule)
+def invalidate_compiled_rules(sender, **kwargs):
+    # Wait for the commit so no worker can recompile from the old rows
+    transaction.on_commit(invalidate_rules)